@@ -1,7 +1,87 @@
+import json
 import os
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # directory that this __init__ file lives in
 __REPOE_DIR__, _ = os.path.split(__file__)
 
 # full path to ./data
 __DATA_PATH__ = os.path.join(__REPOE_DIR__, "data", "")
+
+STAT_TRANSLATIONS_DIR = "stat_translations"
+# the key of stat_translations.json in RePoE.stat_translations, the translations of stat_descriptions.txt
+MAIN_STAT_TRANSLATIONS = "stat_descriptions"
+
+# loaded data files by name, with the modification time of the file they were loaded from
+_cache: Dict[str, Tuple[int, Any]] = {}
+
+
+def _find(name: str) -> Optional[str]:
+    for ext in [".min.json", ".json"]:
+        if os.path.isfile(__DATA_PATH__ + name + ext):
+            return __DATA_PATH__ + name + ext
+    return None
+
+
+def _names(directory: str) -> List[str]:
+    path = os.path.join(__DATA_PATH__, directory)
+    if not os.path.isdir(path):
+        return []
+    files = os.listdir(path)
+    return sorted({f[: -len(".json")].removesuffix(".min") for f in files if f.endswith(".json")})
+
+
+def load(name: str) -> Any:
+    """
+    The data file with the given name relative to the data path, e.g. "mods" or "stat_translations/monster".
+    Files are loaded once and loaded again when they changed on disk, e.g. after running the parser.
+    """
+    path = _find(name)
+    if path is None:
+        raise FileNotFoundError(f"no data file named '{name}' in {__DATA_PATH__}")
+    mtime = os.stat(path).st_mtime_ns
+    cached = _cache.get(name)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding="utf-8") as f:
+            cached = (mtime, json.load(f))
+        _cache[name] = cached
+    return cached[1]
+
+
+class StatTranslations(Mapping):
+    """
+    The stat translation files by the name of the description file they were converted from, e.g. "monster" for
+    monster_stat_descriptions.txt and "stat_descriptions" for stat_descriptions.txt itself.
+    """
+
+    def _name(self, key: str) -> str:
+        return STAT_TRANSLATIONS_DIR if key == MAIN_STAT_TRANSLATIONS else f"{STAT_TRANSLATIONS_DIR}/{key}"
+
+    def __getitem__(self, key: str) -> Any:
+        if not isinstance(key, str) or "/" in key or _find(self._name(key)) is None:
+            raise KeyError(key)
+        return load(self._name(key))
+
+    def __iter__(self) -> Iterator[str]:
+        names = _names(STAT_TRANSLATIONS_DIR)
+        if _find(STAT_TRANSLATIONS_DIR) is not None:
+            names.insert(0, MAIN_STAT_TRANSLATIONS)
+        return iter(names)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+stat_translations = StatTranslations()
+
+
+def __getattr__(name: str) -> Any:
+    # not cached in the module globals, so each access sees changes to the file
+    if not name.startswith("_") and _find(name) is not None:
+        return load(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_names("")))
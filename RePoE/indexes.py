@@ -0,0 +1,123 @@
+# secondary indexes over the exported data, each is built the first time it is queried and again when its data
+# file changed, lookups are dict lookups
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional
+
+import RePoE
+
+EMPTY: FrozenSet[str] = frozenset()
+
+
+class Index:
+    """the ids of the entries of a data file by each key they have, e.g. the mod ids by stat id"""
+
+    def __init__(self, source: str, keys: Callable[[Any], Iterable[Any]]) -> None:
+        self.source = source
+        self.keys = keys
+        self._data: Any = None
+        self._index: Dict[Any, FrozenSet[str]] = {}
+
+    def _build(self, data: Dict[str, Any]) -> None:
+        index: Dict[Any, List[str]] = {}
+        for entry_id, entry in data.items():
+            for key in set(self.keys(entry)):
+                index.setdefault(key, []).append(entry_id)
+        self._index = {key: frozenset(ids) for key, ids in index.items()}
+        self._data = data
+
+    def __getitem__(self, key: Any) -> FrozenSet[str]:
+        data = RePoE.load(self.source)
+        if data is not self._data:
+            self._build(data)
+        return self._index.get(key, EMPTY)
+
+
+class _Ids:
+    """the ids in a data file, to tell unknown ids from ids no entry has"""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self._data: Any = None
+        self._ids: FrozenSet[str] = EMPTY
+
+    def check(self, entry_id: str) -> None:
+        data = RePoE.load(self.source)
+        if data is not self._data:
+            self._ids = frozenset(data)
+            self._data = data
+        if entry_id not in self._ids:
+            raise KeyError(f"unknown id '{entry_id}' in {self.source}")
+
+
+def _positive_tags(weights: List[Dict[str, Any]]) -> Iterable[str]:
+    return (weight["tag"] for weight in weights if weight["weight"] > 0)
+
+
+_stats = _Ids("stats")
+_tags = _Ids("tags")
+
+mods_by_stat = Index("mods", lambda mod: (stat["id"] for stat in mod["stats"]))
+# mods with a positive weight for the tag, whether they spawn on an item also depends on the tags before it
+mods_by_spawn_tag = Index("mods", lambda mod: _positive_tags(mod["spawn_weights"]))
+mods_by_generation_tag = Index("mods", lambda mod: (weight["tag"] for weight in mod["generation_weights"]))
+mods_by_domain = Index("mods", lambda mod: [mod["domain"]])
+mods_by_generation_type = Index("mods", lambda mod: [mod["generation_type"]])
+mods_by_type = Index("mods", lambda mod: [mod["type"]])
+mods_by_group = Index("mods", lambda mod: mod["groups"])
+base_items_by_class = Index("base_items", lambda item: [item["item_class"]])
+base_items_by_tag = Index("base_items", lambda item: item["tags"])
+
+
+def _intersect(sets: List[FrozenSet[str]]) -> FrozenSet[str]:
+    sets.sort(key=len)
+    result = sets[0]
+    for ids in sets[1:]:
+        if not result:
+            break
+        result = result & ids
+    return result
+
+
+def find_mods(
+    stat: Optional[str] = None,
+    spawn_tag: Optional[str] = None,
+    generation_tag: Optional[str] = None,
+    domain: Optional[str] = None,
+    generation_type: Optional[str] = None,
+    mod_type: Optional[str] = None,
+    group: Optional[str] = None,
+) -> FrozenSet[str]:
+    """
+    The ids of the mods matching all given criteria, e.g. find_mods(spawn_tag="ring", domain="item").
+    mod_type is the "type" of the mods, e.g. find_mods(mod_type="IncreasedLife").
+    Unknown stat ids and tags raise a KeyError, so typos are not mistaken for empty results.
+    """
+    if stat is not None:
+        _stats.check(stat)
+    for tag in [spawn_tag, generation_tag]:
+        if tag is not None:
+            _tags.check(tag)
+    criteria = [
+        (mods_by_stat, stat),
+        (mods_by_spawn_tag, spawn_tag),
+        (mods_by_generation_tag, generation_tag),
+        (mods_by_domain, domain),
+        (mods_by_generation_type, generation_type),
+        (mods_by_type, mod_type),
+        (mods_by_group, group),
+    ]
+    sets = [index[key] for index, key in criteria if key is not None]
+    if not sets:
+        return frozenset(RePoE.load("mods"))
+    return _intersect(sets)
+
+
+def find_base_items(item_class: Optional[str] = None, tag: Optional[str] = None) -> FrozenSet[str]:
+    """the ids of the base items of the item class with the tag, either can be omitted"""
+    if tag is not None:
+        _tags.check(tag)
+    sets = [
+        index[key] for index, key in [(base_items_by_class, item_class), (base_items_by_tag, tag)] if key is not None
+    ]
+    if not sets:
+        return frozenset(RePoE.load("base_items"))
+    return _intersect(sets)
@@ -1,3 +1,5 @@
+from typing import Callable, Optional
+
 from PyPoE.poe.file.dat import RelationalReader
 from PyPoE.poe.file.file_system import FileSystem
 from PyPoE.poe.file.shared.cache import AbstractFileCache
@@ -7,21 +9,49 @@ class Parser_Module:
     file_system: FileSystem
     data_path: str
     relational_reader: RelationalReader
+    # number of processes the module may use, and the path worker processes load their file system from
+    jobs: int
+    ggpk_path: Optional[str]
+    # directory for files kept between runs, and whether data from the network may only be read from there
+    cache_dir: Optional[str]
+    offline: bool
     caches: dict[type, AbstractFileCache] = {}
+    # called with each cache created through get_cache
+    cache_watchers: list[Callable[[AbstractFileCache], None]] = []
+    # names of the data files (relative to data_path, without extension) written and read by write().
+    # run_parser uses these to order modules that read the output of other modules.
+    produces: list[str] = []
+    consumes: list[str] = []
+    # whether the module may be skipped when the game files it read last time are unchanged.
+    # Modules that also read data from the network can't know whether their inputs changed.
+    incremental: bool = True
+    # the tables read by write(), including tables reached through foreign keys, mapped to the columns used
+    # (None for all columns). None if the module doesn't declare its tables, e.g. because PyPoE reads them.
+    tables: Optional[dict[str, Optional[list[str]]]] = None
 
     def __init__(
         self,
         file_system: FileSystem,
         data_path: str,
         relational_reader: RelationalReader,
+        jobs: int = 1,
+        ggpk_path: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        offline: bool = False,
     ) -> None:
         self.file_system = file_system
         self.data_path = data_path
         self.relational_reader = relational_reader
+        self.jobs = jobs
+        self.ggpk_path = ggpk_path
+        self.cache_dir = cache_dir
+        self.offline = offline
 
     def get_cache(self, cache_type: type) -> AbstractFileCache:
         if cache_type not in self.caches:
             self.caches[cache_type] = cache_type(self.file_system)
+            for watcher in self.cache_watchers:
+                watcher(self.caches[cache_type])
         return self.caches[cache_type]
 
     def write(self) -> None:
@@ -0,0 +1,143 @@
+import json
+import math
+import os
+from hashlib import sha256
+from io import BytesIO
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image
+
+from RePoE.parser.images import FORMATS, ImageManifest
+from RePoE.parser.output import write_if_changed
+
+# relative to the data path
+INDEX_FILE = "Art/atlases.json"
+ATLAS_DIR = "Art/atlases"
+INDEX_VERSION = 1
+# the largest width and height of an atlas, larger groups are split into several pages
+MAX_SIZE = 2048
+
+
+def _group_name(ddsfile: str) -> str:
+    """icons are grouped by their directory, e.g. Art/2DItems/Currency"""
+    return os.path.dirname(ddsfile)
+
+
+def _group_hash(members: List[Tuple[str, str]]) -> str:
+    return sha256("\n".join(f"{ddsfile} {digest}" for ddsfile, digest in members).encode()).hexdigest()
+
+
+def _pack(sizes: List[Tuple[str, int, int]]) -> List[Tuple[int, int, Dict[str, Tuple[int, int]]]]:
+    """
+    Places the icons on shelves, tallest first, and starts a new page when one is full. Returns the width and
+    height of each page with the position of each icon on it. Only depends on the names and sizes, so the same
+    icons are always packed the same way.
+    """
+    area = sum(w * h for _, w, h in sizes)
+    widest = max(w for _, w, _ in sizes)
+    width = min(MAX_SIZE, max(widest, 2 ** math.ceil(math.log2(max(1, math.isqrt(area))))))
+    pages: List[Tuple[int, int, Dict[str, Tuple[int, int]]]] = []
+    positions: Dict[str, Tuple[int, int]] = {}
+    x = y = shelf = 0
+    for name, w, h in sorted(sizes, key=lambda s: (-s[2], -s[1], s[0])):
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        if y + h > MAX_SIZE and positions:
+            pages.append((width, y + shelf, positions))
+            positions = {}
+            x = y = shelf = 0
+        positions[name] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+    pages.append((width, y + shelf, positions))
+    return pages
+
+
+def _build_group(data_path: str, group: str, members: List[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """writes the atlases of a group, returning the atlases and the rectangle of each member in them"""
+    icons: Dict[str, Image.Image] = {}
+    for ddsfile in members:
+        with Image.open(os.path.join(data_path, os.path.splitext(ddsfile)[0] + ".png")) as image:
+            icons[ddsfile] = image.convert("RGBA")
+    name = ATLAS_DIR + "/" + (group[len("Art/") :] if group.startswith("Art/") else group)
+    atlases: Dict[str, Any] = {}
+    rects: Dict[str, Any] = {}
+    pages = _pack([(ddsfile, icon.width, icon.height) for ddsfile, icon in icons.items()])
+    for page, (width, height, positions) in enumerate(pages):
+        atlas_name = f"{name}/{page}"
+        atlas = Image.new("RGBA", (width, height))
+        for ddsfile, (x, y) in positions.items():
+            icon = icons[ddsfile]
+            atlas.paste(icon, (x, y))
+            rects[ddsfile] = {"atlas": atlas_name, "x": x, "y": y, "w": icon.width, "h": icon.height}
+        os.makedirs(os.path.dirname(os.path.join(data_path, atlas_name)), exist_ok=True)
+        for image_format in FORMATS:
+            out = BytesIO()
+            atlas.save(out, format=image_format)
+            with write_if_changed(os.path.join(data_path, f"{atlas_name}.{image_format}"), "wb") as f:
+                f.write(out.getbuffer())
+        atlases[atlas_name] = {"width": width, "height": height}
+    return atlases, rects
+
+
+def _read_index(path: str) -> Dict[str, Any]:
+    if os.path.isfile(path):
+        with open(path) as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    return {"groups": {}, "atlases": {}, "images": {}}
+
+
+def _remove_stale(data_path: str, atlases: Dict[str, Any]) -> None:
+    keep = {os.path.normpath(os.path.join(data_path, f"{name}.{ext}")) for name in atlases for ext in FORMATS}
+    for path, _, files in os.walk(os.path.join(data_path, ATLAS_DIR), topdown=False):
+        for file in files:
+            file = os.path.normpath(os.path.join(path, file))
+            if file not in keep:
+                os.remove(file)
+        if not os.listdir(path):
+            os.rmdir(path)
+
+
+def build_atlases(data_path: str) -> int:
+    """
+    Packs the exported icons of each directory into atlases and writes an index of the atlas and rectangle of
+    each DDS file. Groups whose icons are unchanged according to the image manifest are not rebuilt.
+    Returns the number of groups that were rebuilt.
+    """
+    groups: Dict[str, List[Tuple[str, str]]] = {}
+    # only reads the manifest, images without their files on disk are left out of it
+    for ddsfile, entry in sorted(ImageManifest(data_path, migrate=False).images.items()):
+        if "png" in entry:
+            groups.setdefault(_group_name(ddsfile), []).append((ddsfile, entry["png"]))
+
+    index_path = os.path.join(data_path, INDEX_FILE)
+    old = _read_index(index_path)
+    index: Dict[str, Any] = {"version": INDEX_VERSION, "groups": {}, "atlases": {}, "images": {}}
+    rebuilt = 0
+    for group, members in groups.items():
+        digest = _group_hash(members)
+        old_rects = [old["images"].get(ddsfile) for ddsfile, _ in members]
+        old_atlases = {rect["atlas"] for rect in old_rects if rect is not None}
+        if (
+            old["groups"].get(group) == digest
+            and None not in old_rects
+            and all(
+                os.path.isfile(os.path.join(data_path, f"{atlas}.{ext}")) for atlas in old_atlases for ext in FORMATS
+            )
+        ):
+            atlases = {atlas: old["atlases"][atlas] for atlas in old_atlases}
+            rects = {ddsfile: rect for (ddsfile, _), rect in zip(members, old_rects)}
+        else:
+            atlases, rects = _build_group(data_path, group, [ddsfile for ddsfile, _ in members])
+            rebuilt += 1
+        index["groups"][group] = digest
+        index["atlases"].update(atlases)
+        index["images"].update(rects)
+
+    _remove_stale(data_path, index["atlases"])
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with write_if_changed(index_path) as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    return rebuilt
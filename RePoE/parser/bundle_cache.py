@@ -0,0 +1,192 @@
+import json
+import mmap
+import os
+import threading
+from hashlib import md5, sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import unquote, urlsplit
+
+import requests
+
+CHUNK_SIZE = 1 << 20
+
+
+def is_url(path: str) -> bool:
+    return path.startswith(("http://", "https://"))
+
+
+class BundleCache:
+    """
+    Keeps the index and bundle files fetched from a patch server on disk, stored by the sha256 of their content.
+
+    Each upstream gets a map of the paths fetched from it. The files of a patch never change, so mapped paths
+    are served without asking the upstream again and exports work offline once every file they read was
+    fetched. Paths of a new patch are requested with the ETag the same path had in the previous patch, so
+    bundles that didn't change are reused instead of downloaded again.
+
+    The upstream may also be a local directory standing in for the patch server.
+    """
+
+    def __init__(self, cache_dir: str, upstream: str) -> None:
+        self.upstream = upstream if upstream.endswith(("/", "\\")) else upstream + "/"
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.map_dir = os.path.join(cache_dir, "versions")
+        self.map_file = os.path.join(self.map_dir, md5(self.upstream.encode()).hexdigest() + ".json")
+        self.files: Dict[str, Dict[str, Any]] = self._read_map(self.map_file).get("files", {})
+        self.previous: Dict[str, Dict[str, Any]] = self._previous_files()
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._path_locks: Dict[str, threading.Lock] = {}
+
+    def _read_map(self, map_file: str) -> Dict[str, Any]:
+        if not os.path.isfile(map_file):
+            return {}
+        with open(map_file) as f:
+            return json.load(f)
+
+    def _previous_files(self) -> Dict[str, Dict[str, Any]]:
+        """the files of the upstream whose map was written last, other than this one"""
+        if not os.path.isdir(self.map_dir):
+            return {}
+        maps = [os.path.join(self.map_dir, f) for f in os.listdir(self.map_dir) if f.endswith(".json")]
+        maps = [f for f in maps if f != self.map_file]
+        if not maps:
+            return {}
+        return self._read_map(max(maps, key=os.path.getmtime)).get("files", {})
+
+    def _blob(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _has_blob(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is not None and os.path.isfile(self._blob(entry["sha256"]))
+
+    def _path_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def _store(self, chunks: Iterable[bytes]) -> str:
+        os.makedirs(self.blob_dir, exist_ok=True)
+        tmp = os.path.join(self.blob_dir, f"{os.getpid()}.{threading.get_ident()}.tmp")
+        digest = sha256()
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+            blob = self._blob(digest.hexdigest())
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(tmp, blob)
+        finally:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+        return digest.hexdigest()
+
+    def _fetch(self, path: str) -> Optional[Dict[str, Any]]:
+        if not is_url(self.upstream):
+            source = os.path.join(self.upstream, path)
+            if not os.path.isfile(source):
+                return None
+            with open(source, "rb") as f:
+                return {"sha256": self._store(iter(lambda: f.read(CHUNK_SIZE), b"")), "etag": None}
+
+        headers = {}
+        previous = self.previous.get(path)
+        if self._has_blob(previous) and previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        with self.session.get(self.upstream + path, headers=headers, stream=True, timeout=60) as response:
+            if response.status_code == 304:
+                return dict(previous)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            digest = self._store(response.iter_content(CHUNK_SIZE))
+            return {"sha256": digest, "etag": response.headers.get("ETag")}
+
+    def _remember(self, path: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.files[path] = entry
+            # other processes may have fetched files of the same patch meanwhile
+            files = self._read_map(self.map_file).get("files", {})
+            files.update(self.files)
+            self.files = files
+            os.makedirs(self.map_dir, exist_ok=True)
+            tmp = f"{self.map_file}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"upstream": self.upstream, "files": files}, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.map_file)
+
+    def get(self, path: str) -> Optional[str]:
+        """the cached file for the path, fetched from the upstream if necessary, None if it doesn't exist"""
+        with self._path_lock(path):
+            entry = self.files.get(path)
+            if self._has_blob(entry):
+                return self._blob(entry["sha256"])
+            entry = self._fetch(path)
+            if entry is None:
+                return None
+            self._remember(path, entry)
+            return self._blob(entry["sha256"])
+
+    def serve(self) -> str:
+        """serves the cache over HTTP on localhost, returning the root url to use instead of the upstream"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="bundle-cache", daemon=True).start()
+        return f"http://127.0.0.1:{server.server_port}/"
+
+
+def _handler(cache: BundleCache) -> type[BaseHTTPRequestHandler]:
+    class BundleCacheHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            self._send(body=True)
+
+        def do_HEAD(self) -> None:
+            self._send(body=False)
+
+        def _send(self, body: bool) -> None:
+            path = unquote(urlsplit(self.path).path).lstrip("/")
+            try:
+                blob = cache.get(path)
+            except Exception as e:
+                self.send_error(502, f"Failed to fetch {path}: {e}")
+                return
+            if blob is None:
+                self.send_error(404)
+                return
+            size = os.path.getsize(blob)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            if body and size:
+                with open(blob, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    self.wfile.write(m)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return BundleCacheHandler
+
+
+def prune(cache_dir: str, keep: int = 2) -> None:
+    """removes the maps of all but the last patches used and the files only they referenced"""
+    map_dir = os.path.join(cache_dir, "versions")
+    blob_dir = os.path.join(cache_dir, "blobs")
+    if not os.path.isdir(map_dir):
+        return
+    maps = sorted(
+        (os.path.join(map_dir, f) for f in os.listdir(map_dir) if f.endswith(".json")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    for map_file in maps[keep:]:
+        os.remove(map_file)
+    referenced = set()
+    for map_file in maps[:keep]:
+        with open(map_file) as f:
+            referenced.update(entry["sha256"] for entry in json.load(f).get("files", {}).values())
+    for directory, _, blobs in os.walk(blob_dir):
+        for blob in blobs:
+            if blob not in referenced:
+                os.remove(os.path.join(directory, blob))
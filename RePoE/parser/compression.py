@@ -0,0 +1,98 @@
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from RePoE.parser import output
+from RePoE.parser.output import write_if_changed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = ["gz", "br", "zst"]
+# the packages needed for each format, gzip is part of the standard library
+PACKAGES = {"gz": None, "br": "brotli", "zst": "zstandard"}
+# files that get compressed copies next to them
+SOURCE_SUFFIX = ".min.json"
+
+
+def _compressor(compression: str) -> Callable[[bytes], bytes]:
+    # maximum compression, the files are compressed once and served many times.
+    # The gzip header has no file name or time, so the same input gives the same bytes.
+    if compression == "gz":
+        return lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if compression == "br":
+        return lambda data: brotli.compress(data, quality=11)
+    if compression == "zst":
+        return zstandard.ZstdCompressor(level=22).compress
+    raise ValueError(f"Unknown compression {compression}")
+
+
+def check_formats(formats: List[str]) -> None:
+    """raises a ValueError for formats that are unknown or whose package isn't installed"""
+    available = {"gz": True, "br": brotli is not None, "zst": zstandard is not None}
+    for compression in formats:
+        if compression not in FORMATS:
+            raise ValueError(f"Unknown compression {compression}, choose from {', '.join(FORMATS)}")
+        if not available[compression]:
+            package = PACKAGES[compression]
+            raise ValueError(
+                f"{compression} compression needs the {package} package, install it with 'pip install {package}'"
+            )
+
+
+def _is_stale(source: str, compressed: str) -> bool:
+    # written files keep their mtime when their content is unchanged, see output.write_if_changed
+    return not os.path.isfile(compressed) or os.path.getmtime(compressed) < os.path.getmtime(source)
+
+
+def _compress(source: str, formats: List[str]) -> int:
+    with open(source, "rb") as f:
+        data = f.read()
+    for compression in formats:
+        compressed = f"{source}.{compression}"
+        with write_if_changed(compressed, "wb") as out:
+            out.write(_compressor(compression)(data))
+        # an unchanged copy keeps its mtime, mark it as up to date with the source
+        os.utime(compressed)
+    return len(formats)
+
+
+def _compress_in_worker(source: str, formats: List[str]) -> Tuple[int, Dict[str, int]]:
+    return _compress(source, formats), output.take_stats()
+
+
+def compress_outputs(data_path: str, formats: List[str], jobs: Optional[int] = None) -> int:
+    """
+    Writes a compressed copy of each .min.json file in the data path for each format, unless the existing copy is
+    newer than the file. Copies of files that no longer exist are removed. Returns the number of copies written.
+    """
+    check_formats(formats)
+    pending: Dict[str, List[str]] = {}
+    for directory, _, files in os.walk(data_path):
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            if name.endswith(SOURCE_SUFFIX):
+                stale = [c for c in formats if _is_stale(path, f"{path}.{c}")]
+                if stale:
+                    pending[path] = stale
+            elif any(name.endswith(f"{SOURCE_SUFFIX}.{c}") for c in FORMATS):
+                if not os.path.isfile(os.path.splitext(path)[0]):
+                    os.remove(path)
+    if not pending:
+        return 0
+    if jobs == 1 or len(pending) == 1:
+        return sum(_compress(path, stale) for path, stale in pending.items())
+    count = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for written, stats in executor.map(_compress_in_worker, pending.keys(), pending.values()):
+            count += written
+            output.add_stats(stats)
+    return count
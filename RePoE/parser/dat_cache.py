@@ -0,0 +1,185 @@
+import inspect
+import json
+import mmap
+import os
+import pickle
+import traceback
+from hashlib import md5
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from PyPoE.poe.file.dat import DatReader, DatRecord, RelationalReader
+from PyPoE.poe.file.file_system import FileSystem
+from PyPoE.poe.file.specification.data import generated
+from PyPoE.poe.file.specification.fields import Specification
+
+# bump when the layout of the cached files changes
+CACHE_VERSION = 1
+
+
+class _CyclicReference(Exception):
+    pass
+
+
+def _specification_version(tables: Optional[Dict[str, Optional[List[str]]]]) -> str:
+    """digest of the generated specification and the columns it was projected to"""
+    with open(inspect.getfile(generated), "rb") as f:
+        return md5(f.read() + repr((CACHE_VERSION, sorted((tables or {}).items()))).encode()).hexdigest()
+
+
+class _TablePickler(pickle.Pickler):
+    """pickles a table with references to rows of other tables and to the specification by name"""
+
+    def __init__(self, file, table: DatReader, specification: Specification) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.table = table
+        self.specification = specification
+        self.specification_files = {id(v): k for k, v in specification.items()}
+
+    def persistent_id(self, obj: Any) -> Optional[Tuple]:
+        if isinstance(obj, DatRecord) and obj.parent is not self.table:
+            return ("row", obj.parent.file_name, obj.rowid)
+        if isinstance(obj, DatReader) and obj is not self.table:
+            return ("table", obj.file_name)
+        if obj is self.specification:
+            return ("specification", None)
+        if id(obj) in self.specification_files:
+            return ("specification", self.specification_files[id(obj)])
+        return None
+
+
+class _TableUnpickler(pickle.Unpickler):
+    def __init__(self, file, cache: "DatTableCache") -> None:
+        super().__init__(file)
+        self.cache = cache
+
+    def persistent_load(self, pid: Tuple) -> Any:
+        kind, file_name, *rest = pid
+        if kind == "specification":
+            return self.cache.specification if file_name is None else self.cache.specification[file_name]
+        if file_name in self.cache.loading:
+            raise _CyclicReference(file_name)
+        table = self.cache.relational_reader[file_name]
+        return table.table_data[rest[0]] if kind == "row" else table
+
+
+class DatTableCache:
+    """
+    Keeps the tables decoded by a relational reader on disk, including their indexes, so later runs and
+    other worker processes can load them instead of decoding the .dat64 files again.
+
+    Cached tables are keyed by the digest of their .dat64 file and the version of the specification,
+    including the columns it was projected to.
+    References to rows of other tables are stored by table name and row id and resolved through the
+    relational reader when a table is loaded.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        file_system: FileSystem,
+        relational_reader: RelationalReader,
+        specification: Specification,
+        tables: Optional[Dict[str, Optional[List[str]]]] = None,
+    ) -> None:
+        self.directory = os.path.join(cache_dir, _specification_version(tables))
+        self.paths_file = os.path.join(cache_dir, "paths.json")
+        self.file_system = file_system
+        self.relational_reader = relational_reader
+        self.specification = specification
+        self.loading: Set[str] = set()
+        # game file paths of the tables, learned the first time each table is decoded
+        self.paths: Dict[str, str] = self._read_paths()
+        self._reads: List[List[Tuple[str, bytes]]] = []
+
+        fs_get_file: Callable = file_system.get_file
+
+        def get_file_recording_reads(path: str, *args, **kwargs) -> bytes:
+            data = fs_get_file(path, *args, **kwargs)
+            if self._reads:
+                self._reads[-1].append((path, data))
+            return data
+
+        file_system.get_file = get_file_recording_reads
+
+        rr_get_file: Callable = relational_reader.get_file
+
+        def get_file_cached(file_name: str, *args, **kwargs) -> DatReader:
+            if file_name in self.relational_reader.files or file_name in self.loading:
+                return rr_get_file(file_name, *args, **kwargs)
+            table = self._load(file_name)
+            if table is not None:
+                self.relational_reader.files[file_name] = table
+                return table
+            self._reads.append([])
+            try:
+                table = rr_get_file(file_name, *args, **kwargs)
+            finally:
+                reads = self._reads.pop()
+            self._store(file_name, table, reads)
+            return table
+
+        relational_reader.get_file = get_file_cached
+
+    def _read_paths(self) -> Dict[str, str]:
+        if not os.path.isfile(self.paths_file):
+            return {}
+        with open(self.paths_file) as f:
+            return json.load(f)
+
+    def _write(self, path: str, write: Callable[[Any], None], mode: str = "wb") -> None:
+        # other processes may use the same cache, write to a temporary file and swap it in
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, mode) as f:
+                write(f)
+            os.replace(tmp, path)
+        finally:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+
+    def _cache_file(self, file_name: str, digest: str) -> str:
+        return os.path.join(self.directory, f"{file_name}.{digest}.pickle")
+
+    def _load(self, file_name: str) -> Optional[DatReader]:
+        if file_name not in self.paths:
+            return None
+        try:
+            data = self.file_system.get_file(self.paths[file_name])
+        except Exception:
+            return None
+        cache_file = self._cache_file(file_name, md5(data).hexdigest())
+        if not os.path.isfile(cache_file):
+            return None
+        self.loading.add(file_name)
+        try:
+            with open(cache_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return _TableUnpickler(m, self).load()
+        except _CyclicReference:
+            return None
+        except Exception:
+            print(f"Failed to load cached {file_name}, decoding it instead")
+            traceback.print_exc()
+            return None
+        finally:
+            self.loading.discard(file_name)
+
+    def _store(self, file_name: str, table: DatReader, reads: List[Tuple[str, bytes]]) -> None:
+        if not reads:
+            return
+        # the table's own file is read first, referenced tables are decoded while reading it
+        path, data = next(
+            ((p, d) for p, d in reads if os.path.basename(p).lower() == file_name.lower()),
+            reads[0],
+        )
+        cache_file = self._cache_file(file_name, md5(data).hexdigest())
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            self._write(cache_file, lambda f: _TablePickler(f, table, self.specification).dump(table))
+        except Exception:
+            print(f"Failed to cache {file_name}")
+            traceback.print_exc()
+            return
+        if self.paths.get(file_name) != path:
+            self.paths = self._read_paths()
+            self.paths[file_name] = path
+            self._write(self.paths_file, lambda f: json.dump(self.paths, f, indent=2, sort_keys=True), "w")
@@ -0,0 +1,38 @@
+import json
+import os
+from typing import Dict
+
+from RePoE.parser.output import write_if_changed
+
+INDEX_FILE = "index.json"
+# the files written for each exported object, with the suffix clients append to its name
+FORMATS = ["json", "min.json", "msgpack", "min.json.gz", "min.json.br", "min.json.zst"]
+
+
+def is_index_current(data_path: str, version: str) -> bool:
+    """whether the index exists for the version, it only has to be written again when files changed"""
+    path = os.path.join(data_path, INDEX_FILE)
+    if not os.path.isfile(path):
+        return False
+    with open(path) as f:
+        return json.load(f).get("version") == version
+
+
+def write_index(data_path: str, version: str) -> None:
+    """
+    Lists each object exported to the data path with the size of the file in each format it is available in,
+    e.g. {"stats": {"json": ..., "min.json": ..., "msgpack": ...}}, so clients can pick the one they decode fastest.
+    """
+    files: Dict[str, Dict[str, int]] = {}
+    for directory, _, names in os.walk(data_path):
+        for name in names:
+            suffix = next((f for f in sorted(FORMATS, key=len, reverse=True) if name.endswith("." + f)), None)
+            base = None if suffix is None else name[: -len(suffix) - 1]
+            # only objects with a compact version come from write_json
+            if base is None or not os.path.isfile(os.path.join(directory, base + ".min.json")):
+                continue
+            key = os.path.relpath(os.path.join(directory, base), data_path).replace(os.sep, "/")
+            path = os.path.join(directory, name)
+            files.setdefault(key, {})[suffix] = os.path.getsize(path)
+    with write_if_changed(os.path.join(data_path, INDEX_FILE)) as f:
+        json.dump({"version": version, "files": files}, f, indent=2, sort_keys=True)
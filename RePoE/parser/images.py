@@ -0,0 +1,198 @@
+import json
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import wait as wait_futures
+from hashlib import md5
+from io import BytesIO
+from threading import BoundedSemaphore
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from RePoE.parser.output import write_if_changed
+
+# images submitted but not yet encoded, further submissions wait for a slot to bound the memory of pending images
+MAX_PENDING = 256
+
+# relative to the data path
+MANIFEST_FILE = "Art/images.json"
+MANIFEST_VERSION = 1
+FORMATS = ["png", "webp"]
+
+
+def encode(data: bytes, dest: str) -> Dict[str, str]:
+    """decodes a DDS file and saves it as dest.png and dest.webp, returning the md5 of each file"""
+    digests = {}
+    with Image.open(BytesIO(data)) as image:
+        for image_format in FORMATS:
+            out = BytesIO()
+            image.save(out, format=image_format)
+            with open(f"{dest}.{image_format}", "wb") as f:
+                f.write(out.getbuffer())
+            digests[image_format] = md5(out.getbuffer()).hexdigest()
+    return digests
+
+
+class ImageManifest:
+    """
+    The md5 of the DDS file each image was exported from and of the files written for it, by DDS path.
+    Output images can vary slightly for the same input, the DDS hash avoids committing unnecessary changes.
+    """
+
+    def __init__(self, data_path: str, migrate: bool = True) -> None:
+        self.data_path = data_path
+        self.path = os.path.join(data_path, MANIFEST_FILE)
+        self.images = self._read()
+        self.changed: Dict[str, Dict[str, str]] = {}
+        # .dds.md5sum files of earlier versions, removed once their hashes are in the manifest
+        self.legacy: List[str] = []
+        if migrate and not os.path.isfile(self.path):
+            self._migrate()
+        self._forget_missing()
+
+    def _read(self) -> Dict[str, Dict[str, str]]:
+        if not os.path.isfile(self.path):
+            return {}
+        with open(self.path) as f:
+            manifest = json.load(f)
+        return manifest["images"] if manifest.get("version") == MANIFEST_VERSION else {}
+
+    def _migrate(self) -> None:
+        for directory, _, files in os.walk(self.data_path):
+            for file in files:
+                if not file.endswith(".dds.md5sum"):
+                    continue
+                path = os.path.join(directory, file)
+                dest = path[: -len(".dds.md5sum")]
+                if all(os.path.isfile(f"{dest}.{image_format}") for image_format in FORMATS):
+                    ddsfile = os.path.relpath(dest, self.data_path).replace(os.sep, "/") + ".dds"
+                    with open(path) as f:
+                        entry = {"dds": f.read().strip()}
+                    for image_format in FORMATS:
+                        with open(f"{dest}.{image_format}", "rb") as f:
+                            entry[image_format] = md5(f.read()).hexdigest()
+                    self.update(ddsfile, entry)
+                self.legacy.append(path)
+
+    def _forget_missing(self) -> None:
+        """drops the images whose files were deleted, so they are exported again, with one walk of their folders"""
+        existing = set()
+        for top in {ddsfile.split("/")[0] for ddsfile in self.images}:
+            for directory, _, files in os.walk(os.path.join(self.data_path, top)):
+                relative = os.path.relpath(directory, self.data_path).replace(os.sep, "/")
+                existing.update(f"{relative}/{file}" for file in files)
+        for ddsfile in list(self.images):
+            stem = os.path.splitext(ddsfile)[0]
+            if any(f"{stem}.{image_format}" not in existing for image_format in FORMATS):
+                del self.images[ddsfile]
+
+    def is_current(self, ddsfile: str, digest: str) -> bool:
+        return self.images.get(ddsfile, {}).get("dds") == digest
+
+    def update(self, ddsfile: str, entry: Dict[str, str]) -> None:
+        self.images[ddsfile] = entry
+        self.changed[ddsfile] = entry
+
+    def save(self) -> None:
+        if not self.changed and not self.legacy:
+            return
+        # other processes may have exported images to the same manifest meanwhile
+        images = self._read()
+        images.update(self.changed)
+        self.images = images
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with write_if_changed(self.path) as f:
+            json.dump({"version": MANIFEST_VERSION, "images": images}, f, indent=2, sort_keys=True)
+        for path in self.legacy:
+            os.remove(path)
+        self.changed.clear()
+        self.legacy.clear()
+
+
+class ImagePool:
+    """
+    Encodes images in worker processes while the module that exported them keeps converting. Failures are
+    collected instead of printed, see wait.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING) -> None:
+        self.executor: Optional[ProcessPoolExecutor] = None
+        # the number of processes images are encoded in
+        self.jobs = 1
+        self.manifest: Optional[ImageManifest] = None
+        self.slots = BoundedSemaphore(max_pending)
+        self.pending: List[Tuple[str, str, Future]] = []
+        self.failures: List[str] = []
+
+    def get_manifest(self, data_path: str) -> ImageManifest:
+        """the manifest of the data path, read once"""
+        if self.manifest is None or self.manifest.data_path != data_path:
+            if self.manifest is not None:
+                self.manifest.save()
+            self.manifest = ImageManifest(data_path)
+        return self.manifest
+
+    def submit(self, ddsfile: str, digest: str, data: bytes, dest: str) -> None:
+        """encodes the DDS data to dest, its manifest entry is updated by wait once it was saved"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        self.slots.acquire()
+        future = self.executor.submit(encode, data, dest)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.pending.append((ddsfile, digest, future))
+
+    def fail(self, ddsfile: str, reason: str) -> None:
+        self.failures.append(f"{ddsfile}: {reason}")
+
+    def wait(self) -> List[str]:
+        """waits for the submitted images and saves the manifest, returning the failures since the last call"""
+        wait_futures([future for _, _, future in self.pending])
+        for ddsfile, digest, future in self.pending:
+            error = future.exception()
+            if error is None:
+                self.manifest.update(ddsfile, {"dds": digest, **future.result()})
+            else:
+                # not in the manifest, so the next run exports it again
+                self.fail(ddsfile, f"{type(error).__name__}: {error}")
+        self.pending.clear()
+        if self.manifest is not None:
+            self.manifest.save()
+        failures = self.failures
+        self.failures = []
+        return failures
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+class ImageQueue:
+    """
+    The DDS files modules registered, in the order they were first registered. Many are shared between modules,
+    e.g. base items and their unique art, they are exported once after all modules converted.
+    """
+
+    def __init__(self) -> None:
+        self.files: Dict[str, None] = {}
+
+    def register(self, ddsfile: str) -> None:
+        self.files.setdefault(ddsfile)
+
+    def take(self) -> List[str]:
+        """the files registered since the last call"""
+        files = list(self.files)
+        self.files.clear()
+        return files
+
+
+# the pool and queue of this process, shared by all modules it runs
+pool = ImagePool()
+queue = ImageQueue()
+
+
+def report_failures(failures: List[str]) -> None:
+    if failures:
+        print(f"Failed to export {len(failures)} images:")
+        for failure in failures:
+            print("  " + failure)
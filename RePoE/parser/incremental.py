@@ -0,0 +1,178 @@
+import inspect
+import json
+import os
+from contextlib import contextmanager
+from hashlib import md5
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from PyPoE.poe.file.file_system import FileSystem
+from PyPoE.poe.file.shared.cache import AbstractFileCache
+from PyPoE.poe.file.specification.data import generated
+
+from RePoE import __REPOE_DIR__
+from RePoE.parser import Parser_Module
+
+MANIFEST_VERSION = 2
+
+
+def _digest(data: bytes) -> str:
+    return md5(data).hexdigest()
+
+
+def _digest_file(path: str) -> Optional[str]:
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return _digest(f.read())
+
+
+class InputRecorder:
+    """
+    Records the digests of all game files read through a file system, including files that are read
+    indirectly through the relational reader or file caches and files that were already cached by an
+    earlier module.
+    """
+
+    def __init__(self, file_system: FileSystem) -> None:
+        self.digests: Dict[str, str] = {}
+        # game files read to create each cached file, keyed by cache and file name
+        self.cached: Dict[Tuple[int, str], Set[str]] = {}
+        # game files read outside of any recording, e.g. while constructing a cache
+        self.unattributed: Set[str] = set()
+        self._frames: List[Set[str]] = []
+
+        get_file: Callable = file_system.get_file
+
+        def recording_get_file(path: str, *args, **kwargs) -> bytes:
+            data = get_file(path, *args, **kwargs)
+            if path not in self.digests:
+                self.digests[path] = _digest(data)
+            self._add({path})
+            return data
+
+        file_system.get_file = recording_get_file
+
+    def _add(self, paths: Set[str]) -> None:
+        if not self._frames:
+            self.unattributed.update(paths)
+        for frame in self._frames:
+            frame.update(paths)
+
+    def watch(self, cache: AbstractFileCache) -> None:
+        get_file: Callable = cache.get_file
+        # files cached before we started watching get all reads we have not attributed so far
+        for file_name in getattr(cache, "files", {}):
+            self.cached[(id(cache), file_name)] = set(self.unattributed)
+
+        def recording_get_file(file_name: str, *args, **kwargs) -> Any:
+            key = (id(cache), file_name)
+            if key in self.cached:
+                self._add(self.cached[key])
+                return get_file(file_name, *args, **kwargs)
+            with self.record() as paths:
+                result = get_file(file_name, *args, **kwargs)
+            self.cached[key] = paths
+            self._add(paths)
+            return result
+
+        cache.get_file = recording_get_file
+
+    def add(self, digests: Dict[str, str]) -> None:
+        """adds files read by another process"""
+        self.digests.update(digests)
+        self._add(set(digests))
+
+    @contextmanager
+    def record(self) -> Iterator[Set[str]]:
+        paths: Set[str] = set()
+        self._frames.append(paths)
+        try:
+            yield paths
+        finally:
+            self._frames.pop()
+
+    def get_digests(self, paths: Set[str]) -> Dict[str, str]:
+        return {path: self.digests[path] for path in sorted(paths)}
+
+
+def _manifest_path(cache_dir: str, parser_module: type[Parser_Module]) -> str:
+    return os.path.join(cache_dir, "manifests", parser_module.__name__ + ".json")
+
+
+def _data_file(data_path: str, name: str) -> str:
+    return data_path + name + ".min.json"
+
+
+def _digest_data(data_path: str, name: str) -> Optional[str]:
+    """the digest of a data file and of the files in the folder of the same name, e.g. stat_translations/"""
+    digest = _digest_file(_data_file(data_path, name))
+    folder = data_path + name
+    if not os.path.isdir(folder):
+        return digest
+    files = sorted(
+        os.path.relpath(os.path.join(path, f), folder)
+        for path, _, fs in os.walk(folder)
+        for f in fs
+        if f.endswith(".min.json")
+    )
+    return _digest(json.dumps([digest] + [[f, _digest_file(os.path.join(folder, f))] for f in files]).encode())
+
+
+def _output_exists(data_path: str, name: str) -> bool:
+    return any(os.path.exists(data_path + name + ext) for ext in ["", ".json", ".min.json"])
+
+
+def _code_digests(parser_module: type[Parser_Module]) -> Dict[str, Optional[str]]:
+    parser_dir = os.path.dirname(inspect.getfile(Parser_Module))
+    files = [inspect.getfile(parser_module), inspect.getfile(generated), os.path.join(__REPOE_DIR__, "schema.txt")]
+    files += [os.path.join(parser_dir, f) for f in sorted(os.listdir(parser_dir)) if f.endswith(".py")]
+    return {os.path.basename(f): _digest_file(f) for f in files}
+
+
+def create_manifest(
+    parser_module: type[Parser_Module], data_path: str, digests: Dict[str, str], images: List[str]
+) -> Dict[str, Any]:
+    return {
+        "version": MANIFEST_VERSION,
+        "code": _code_digests(parser_module),
+        "data": {name: _digest_data(data_path, name) for name in parser_module.consumes},
+        "inputs": digests,
+        "images": images,
+    }
+
+
+def write_manifest(cache_dir: str, parser_module: type[Parser_Module], manifest: Dict[str, Any]) -> None:
+    path = _manifest_path(cache_dir, parser_module)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def read_images(cache_dir: str, parser_module: type[Parser_Module]) -> List[str]:
+    """the DDS files the module registered when it last ran"""
+    with open(_manifest_path(cache_dir, parser_module)) as f:
+        return json.load(f)["images"]
+
+
+def is_up_to_date(cache_dir: str, parser_module: type[Parser_Module], data_path: str, file_system: FileSystem) -> bool:
+    """whether the inputs recorded in the last manifest of the module are unchanged and its outputs exist"""
+    path = _manifest_path(cache_dir, parser_module)
+    if not parser_module.incremental or not os.path.isfile(path):
+        return False
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION or manifest["code"] != _code_digests(parser_module):
+        return False
+    if not all(_output_exists(data_path, name) for name in parser_module.produces):
+        return False
+    for name, digest in manifest["data"].items():
+        if _digest_data(data_path, name) != digest:
+            return False
+    for game_file, digest in manifest["inputs"].items():
+        try:
+            if _digest(file_system.get_file(game_file)) != digest:
+                return False
+        except Exception:
+            return False
+    return True
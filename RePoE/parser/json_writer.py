@@ -0,0 +1,268 @@
+import io
+import re
+from json.encoder import INFINITY, encode_basestring_ascii
+from typing import Any, List, Optional, Set, TextIO, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+INDENT = "  "
+# number of pending chunks after which they are written to the files
+FLUSH_CHUNKS = 1 << 14
+
+BACKENDS = ["python", "orjson"]
+# the backend used by write_json_files and whether its output is compared to that of the python backend
+backend = "python"
+conformance = False
+
+
+def _floatstr(o: float) -> str:
+    if o != o:
+        return "NaN"
+    if o == INFINITY:
+        return "Infinity"
+    if o == -INFINITY:
+        return "-Infinity"
+    return float.__repr__(o)
+
+
+def _key(key: Any) -> str:
+    if isinstance(key, str):
+        return encode_basestring_ascii(key)
+    if isinstance(key, float):
+        return encode_basestring_ascii(_floatstr(key))
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return encode_basestring_ascii(int.__repr__(key))
+    raise TypeError(f"keys must be str, int, float, bool or None, not {key.__class__.__name__}")
+
+
+class DualJsonWriter:
+    """
+    Writes an object as indented json and as compact json without None values in dicts, walking it only once.
+
+    The output is the same as that of json.dump with indent=2 and sort_keys=True, and of json.dump with
+    separators=(",", ":") and sort_keys=True of the object passed through util.minimize, which leaves
+    tuples as they are.
+    """
+
+    def __init__(self, pretty: TextIO, compact: TextIO) -> None:
+        self.pretty_file = pretty
+        self.compact_file = compact
+        self.pretty: List[str] = []
+        self.compact: List[str] = []
+        self.markers: Set[int] = set()
+
+    def write(self, o: Any) -> None:
+        self._value(o, 0, True)
+        self.flush()
+
+    def flush(self) -> None:
+        self.pretty_file.write("".join(self.pretty))
+        self.compact_file.write("".join(self.compact))
+        self.pretty.clear()
+        self.compact.clear()
+
+    def _scalar(self, o: Any) -> Any:
+        if isinstance(o, str):
+            return encode_basestring_ascii(o)
+        if o is None:
+            return "null"
+        if o is True:
+            return "true"
+        if o is False:
+            return "false"
+        if isinstance(o, int):
+            return int.__repr__(o)
+        if isinstance(o, float):
+            return _floatstr(o)
+        return None
+
+    def _value(self, o: Any, level: int, minimize: bool) -> None:
+        s = self._scalar(o)
+        if s is not None:
+            self.pretty.append(s)
+            self.compact.append(s)
+        elif isinstance(o, (list, tuple)):
+            # util.minimize doesn't descend into tuples
+            self._list(o, level, minimize and not isinstance(o, tuple))
+        elif isinstance(o, dict):
+            self._dict(o, level, minimize)
+        else:
+            raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
+
+    def _enter(self, o: Any) -> None:
+        if id(o) in self.markers:
+            raise ValueError("Circular reference detected")
+        self.markers.add(id(o))
+        if len(self.pretty) > FLUSH_CHUNKS:
+            self.flush()
+
+    def _list(self, o: Any, level: int, minimize: bool) -> None:
+        if not o:
+            self.pretty.append("[]")
+            self.compact.append("[]")
+            return
+        self._enter(o)
+        separator = ",\n" + INDENT * (level + 1)
+        self.pretty.append("[" + separator[1:])
+        self.compact.append("[")
+        first = True
+        for value in o:
+            if not first:
+                self.pretty.append(separator)
+                self.compact.append(",")
+            first = False
+            self._value(value, level + 1, minimize)
+        self.pretty.append("\n" + INDENT * level + "]")
+        self.compact.append("]")
+        self.markers.remove(id(o))
+
+    def _dict(self, o: Any, level: int, minimize: bool) -> None:
+        if not o:
+            self.pretty.append("{}")
+            self.compact.append("{}")
+            return
+        self._enter(o)
+        separator = ",\n" + INDENT * (level + 1)
+        self.pretty.append("{")
+        self.compact.append("{")
+        first_pretty = first_compact = True
+        for key, value in sorted(o.items()):
+            key = _key(key)
+            self.pretty.append((separator[1:] if first_pretty else separator) + key + ": ")
+            first_pretty = False
+            if value is None and minimize:
+                self.pretty.append("null")
+                continue
+            self.compact.append((key if first_compact else "," + key) + ":")
+            first_compact = False
+            self._value(value, level + 1, minimize)
+        self.pretty.append("\n" + INDENT * level + "}")
+        self.compact.append("}")
+        self.markers.remove(id(o))
+
+
+def configure(json_backend: str = "python", json_conformance: bool = False) -> None:
+    global backend, conformance
+    if json_backend not in BACKENDS:
+        raise ValueError(f"Unknown json backend {json_backend}, choose from {', '.join(BACKENDS)}")
+    if json_backend == "orjson" and orjson is None:
+        raise ValueError("The orjson backend needs the orjson package, install it with 'pip install orjson'")
+    backend = json_backend
+    conformance = json_conformance
+
+
+class _Unsupported(Exception):
+    pass
+
+
+# values written the same by both backends without further checks
+_LEAVES = {str, int, bool, type(None)}
+
+
+def _check(value: Any) -> None:
+    """raises _Unsupported for values orjson doesn't write like json.dump"""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if not isinstance(k, str):
+                # json.dump sorts these by value, not by their string
+                raise _Unsupported(f"key {k!r}")
+            if type(v) not in _LEAVES:
+                _check(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            if type(v) not in _LEAVES:
+                _check(v)
+    elif isinstance(value, float):
+        if value != value or value in (INFINITY, -INFINITY):
+            raise _Unsupported(repr(value))
+    elif value is not None and not isinstance(value, (str, int)):
+        raise _Unsupported(f"type {type(value).__name__}")
+
+
+def _minimize_checked(value: Any) -> Any:
+    """util.minimize, checking the values on the way"""
+    if isinstance(value, dict):
+        result = {}
+        for k, v in value.items():
+            if not isinstance(k, str):
+                raise _Unsupported(f"key {k!r}")
+            if v is not None:
+                result[k] = v if type(v) in _LEAVES else _minimize_checked(v)
+        return result
+    if isinstance(value, list):
+        return [v if type(v) in _LEAVES else _minimize_checked(v) for v in value]
+    _check(value)
+    return value
+
+
+# orjson formats floats from 1e16 and below 0.0001 differently than repr, e.g. 1e16 and 0.00001.
+# Output that may contain such a float is written by the python backend instead.
+_EXPONENT = re.compile(rb"\de")
+_NOT_PRINTABLE_ASCII = re.compile(r"[^\x00-\x7e]")
+
+
+def _ascii_escape(match: re.Match) -> str:
+    return encode_basestring_ascii(match.group(0))[1:-1]
+
+
+def _from_orjson(data: bytes) -> str:
+    if b"0.0000" in data or _EXPONENT.search(data):
+        raise _Unsupported("float formatting")
+    text = data.decode()
+    if not text.isascii() or "\x7f" in text:
+        text = _NOT_PRINTABLE_ASCII.sub(_ascii_escape, text)
+    return text
+
+
+def _orjson_pair(o: Any) -> Optional[Tuple[str, str]]:
+    """the indented and the compact json, None if orjson can't produce the same output as json.dump"""
+    try:
+        minimized = _minimize_checked(o)
+        pretty = orjson.dumps(o, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+        compact = orjson.dumps(minimized, option=orjson.OPT_SORT_KEYS)
+        return _from_orjson(pretty), _from_orjson(compact)
+    except (_Unsupported, TypeError):
+        return None
+
+
+def _python_pair(o: Any) -> Tuple[str, str]:
+    pretty, compact = io.StringIO(), io.StringIO()
+    DualJsonWriter(pretty, compact).write(o)
+    return pretty.getvalue(), compact.getvalue()
+
+
+def _first_difference(a: str, b: str) -> int:
+    return next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+
+
+def write_json_files(o: Any, pretty: TextIO, compact: TextIO, name: str = "") -> None:
+    """
+    Writes the indented and compact json with the configured backend. The python backend is the reference,
+    other backends fall back to it for objects they can't write identically.
+    """
+    if backend == "orjson":
+        texts = _orjson_pair(o)
+        if texts is not None and conformance:
+            reference = _python_pair(o)
+            for text, expected, kind in zip(texts, reference, ["json", "min.json"]):
+                if text != expected:
+                    i = _first_difference(text, expected)
+                    print(
+                        f"\nWarning: orjson output of {name}.{kind} differs at offset {i}: "
+                        f"{text[max(0, i - 40):i + 40]!r} != {expected[max(0, i - 40):i + 40]!r}"
+                    )
+            texts = reference
+        if texts is not None:
+            pretty.write(texts[0])
+            compact.write(texts[1])
+            return
+    DualJsonWriter(pretty, compact).write(o)
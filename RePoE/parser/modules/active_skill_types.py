@@ -3,6 +3,11 @@ from RePoE.parser import Parser_Module
 
 
 class active_skill_types(Parser_Module):
+    produces = ["active_skill_types"]
+    tables = {
+        "ActiveSkillType.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         types = [row["Id"] for row in self.relational_reader["ActiveSkillType.dat64"]]
         write_json(types, self.data_path, "active_skill_types")
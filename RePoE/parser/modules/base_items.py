@@ -6,7 +6,14 @@ from PyPoE.poe.file.dat import DatReader, DatRecord
 from PyPoE.poe.file.it import ITFileCache
 
 from RePoE.parser import Parser_Module
-from RePoE.parser.util import call_with_default_args, export_image, get_release_state, write_json
+from RePoE.parser.util import (
+    call_with_default_args,
+    get_release_state,
+    register_image,
+    write_json,
+    write_json_shards,
+    write_ndjson,
+)
 
 
 def _create_default_dict(relation: DatReader) -> Dict:
@@ -189,6 +196,59 @@ ITEM_CLASS_BLACKLIST = {
 
 
 class base_items(Parser_Module):
+    produces = ["base_items"]
+    tables = {
+        "ComponentAttributeRequirements.dat64": ["BaseItemTypesKey", "ReqStr", "ReqDex", "ReqInt"],
+        "ArmourTypes.dat64": [
+            "BaseItemTypesKey",
+            "ArmourMin",
+            "ArmourMax",
+            "EvasionMin",
+            "EvasionMax",
+            "EnergyShieldMin",
+            "EnergyShieldMax",
+            "IncreasedMovementSpeed",
+        ],
+        "ShieldTypes.dat64": ["BaseItemTypesKey", "Block"],
+        "Flasks.dat64": [
+            "BaseItemTypesKey",
+            "LifePerUse",
+            "ManaPerUse",
+            "RecoveryTime",
+            "BuffDefinitionsKey",
+            "BuffStatValues",
+        ],
+        "BuffDefinitions.dat64": ["Id", "StatsKeys"],
+        "ComponentCharges.dat64": ["BaseItemTypesKey", "MaxCharges", "PerCharge"],
+        "WeaponTypes.dat64": ["BaseItemTypesKey", "Critical", "Speed", "DamageMin", "DamageMax", "RangeMax"],
+        "CurrencyItems.dat64": [
+            "BaseItemTypesKey",
+            "StackSize",
+            "Directions",
+            "FullStack_BaseItemTypesKey",
+            "Description",
+            "CurrencyTab_StackSize",
+        ],
+        "BaseItemTypes.dat64": [
+            "Id",
+            "Name",
+            "ItemClassesKey",
+            "InheritsFrom",
+            "ModDomain",
+            "Width",
+            "Height",
+            "DropLevel",
+            "Implicit_ModsKeys",
+            "TagsKeys",
+            "ItemVisualIdentity",
+        ],
+        "ItemClasses.dat64": ["Id"],
+        "ItemVisualIdentity.dat64": ["Id", "DDSFile"],
+        "Mods.dat64": ["Id"],
+        "Stats.dat64": ["Id"],
+        "Tags.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         relational_reader = self.relational_reader
         attribute_requirements = _create_default_dict(relational_reader["ComponentAttributeRequirements.dat64"])
@@ -202,53 +262,56 @@ class base_items(Parser_Module):
 
         root = {}
         skipped_item_classes = set()
-        for item in relational_reader["BaseItemTypes.dat64"]:
-            if item["ItemClassesKey"]["Id"] in ITEM_CLASS_BLACKLIST:
-                skipped_item_classes.add(item["ItemClassesKey"]["Id"])
-                continue
-            elif item["ItemClassesKey"]["Id"] in ITEM_CLASS_WHITELIST:
-                pass
-            else:
-                print(f"Unknown item class, not in whitelist or blacklist: {item['ItemClassesKey']['Id']}")
-                continue
-
-            it_path = item["InheritsFrom"] + ".it"
-            inherited_tags = list(self.get_cache(ITFileCache)[it_path]["Base"]["tag"])
-            mod_domain = MOD_DOMAIN(item["ModDomain"])
-            item_id = item["Id"]
-            properties: Dict = {}
-            _convert_armour_properties(armour_types[item_id], properties)
-            _convert_shield_properties(shield_types[item_id], properties)
-            _convert_flask_properties(flask_types[item_id], properties)
-            _convert_flask_charge_properties(flask_charges[item_id], properties)
-            _convert_weapon_properties(weapon_types[item_id], properties)
-            _convert_currency_properties(currency_type[item_id], properties)
-            root[item_id] = {
-                "name": item["Name"],
-                "item_class": item["ItemClassesKey"]["Id"],
-                "inventory_width": item["Width"],
-                "inventory_height": item["Height"],
-                "drop_level": item["DropLevel"],
-                "implicits": [mod["Id"] for mod in item["Implicit_ModsKeys"]],
-                "tags": [tag["Id"] for tag in item["TagsKeys"]] + inherited_tags,
-                "visual_identity": {
-                    "id": item["ItemVisualIdentity"]["Id"],
-                    "dds_file": item["ItemVisualIdentity"]["DDSFile"],
-                },
-                "requirements": _convert_requirements(attribute_requirements[item_id], item["DropLevel"]),
-                "properties": properties,
-                "release_state": get_release_state(item_id).name,
-                "domain": mod_domain.name.lower()
-                if mod_domain and mod_domain is not MOD_DOMAIN.MODS_DISALLOWED
-                else "undefined",
-            }
-            _convert_flask_buff(flask_types[item_id], root[item_id])
-
-            if item["ItemVisualIdentity"]["DDSFile"]:
-                export_image(item["ItemVisualIdentity"]["DDSFile"], self.data_path, self.file_system)
+        with write_ndjson(self.data_path, "base_items") as write_row:
+            for item in relational_reader["BaseItemTypes.dat64"]:
+                if item["ItemClassesKey"]["Id"] in ITEM_CLASS_BLACKLIST:
+                    skipped_item_classes.add(item["ItemClassesKey"]["Id"])
+                    continue
+                elif item["ItemClassesKey"]["Id"] in ITEM_CLASS_WHITELIST:
+                    pass
+                else:
+                    print(f"Unknown item class, not in whitelist or blacklist: {item['ItemClassesKey']['Id']}")
+                    continue
+
+                it_path = item["InheritsFrom"] + ".it"
+                inherited_tags = list(self.get_cache(ITFileCache)[it_path]["Base"]["tag"])
+                mod_domain = MOD_DOMAIN(item["ModDomain"])
+                item_id = item["Id"]
+                properties: Dict = {}
+                _convert_armour_properties(armour_types[item_id], properties)
+                _convert_shield_properties(shield_types[item_id], properties)
+                _convert_flask_properties(flask_types[item_id], properties)
+                _convert_flask_charge_properties(flask_charges[item_id], properties)
+                _convert_weapon_properties(weapon_types[item_id], properties)
+                _convert_currency_properties(currency_type[item_id], properties)
+                root[item_id] = {
+                    "name": item["Name"],
+                    "item_class": item["ItemClassesKey"]["Id"],
+                    "inventory_width": item["Width"],
+                    "inventory_height": item["Height"],
+                    "drop_level": item["DropLevel"],
+                    "implicits": [mod["Id"] for mod in item["Implicit_ModsKeys"]],
+                    "tags": [tag["Id"] for tag in item["TagsKeys"]] + inherited_tags,
+                    "visual_identity": {
+                        "id": item["ItemVisualIdentity"]["Id"],
+                        "dds_file": item["ItemVisualIdentity"]["DDSFile"],
+                    },
+                    "requirements": _convert_requirements(attribute_requirements[item_id], item["DropLevel"]),
+                    "properties": properties,
+                    "release_state": get_release_state(item_id).name,
+                    "domain": mod_domain.name.lower()
+                    if mod_domain and mod_domain is not MOD_DOMAIN.MODS_DISALLOWED
+                    else "undefined",
+                }
+                _convert_flask_buff(flask_types[item_id], root[item_id])
+                write_row(item_id, root[item_id])
+
+                if item["ItemVisualIdentity"]["DDSFile"]:
+                    register_image(item["ItemVisualIdentity"]["DDSFile"])
 
         print(f"Skipped the following item classes for base_items {skipped_item_classes}")
         write_json(root, self.data_path, "base_items")
+        write_json_shards(root, self.data_path, "base_items", lambda _, item: item["item_class"])
 
 
 if __name__ == "__main__":
@@ -3,6 +3,24 @@ from RePoE.parser import Parser_Module
 
 
 class characters(Parser_Module):
+    produces = ["characters"]
+    tables = {
+        "Characters.dat64": [
+            "Id",
+            "IntegerId",
+            "Name",
+            "BaseMaxLife",
+            "BaseMaxMana",
+            "BaseStrength",
+            "BaseDexterity",
+            "BaseIntelligence",
+            "WeaponSpeed",
+            "MinDamage",
+            "MaxDamage",
+            "MaxAttackDistance",
+        ],
+    }
+
     def write(self):
         root = []
         for row in self.relational_reader["Characters.dat64"]:
@@ -3,6 +3,13 @@ from RePoE.parser import Parser_Module
 
 
 class cluster_jewel_notables(Parser_Module):
+    produces = ["cluster_jewel_notables"]
+    tables = {
+        "PassiveTreeExpansionSpecialSkills.dat64": ["PassiveSkillsKey", "StatsKey"],
+        "PassiveSkills.dat64": ["Id", "Name"],
+        "Stats.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         data = []
         for row in self.relational_reader["PassiveTreeExpansionSpecialSkills.dat64"]:
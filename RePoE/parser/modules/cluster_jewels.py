@@ -6,6 +6,26 @@ from RePoE.parser.util import call_with_default_args, write_json
 
 
 class cluster_jewels(Parser_Module):
+    produces = ["cluster_jewels"]
+    tables = {
+        "PassiveTreeExpansionSkills.dat64": ["PassiveTreeExpansionJewelSizesKey", "PassiveSkillsKey", "TagsKey"],
+        "PassiveTreeExpansionJewelSizes.dat64": ["Name"],
+        "PassiveSkills.dat64": None,
+        "Stats.dat64": ["Id"],
+        "Tags.dat64": ["Id"],
+        "PassiveTreeExpansionJewels.dat64": [
+            "PassiveTreeExpansionJewelSizesKey",
+            "BaseItemTypesKey",
+            "MinNodes",
+            "MaxNodes",
+            "SmallIndices",
+            "NotableIndices",
+            "SocketIndices",
+            "TotalIndices",
+        ],
+        "BaseItemTypes.dat64": ["Id", "Name"],
+    }
+
     def write(self) -> None:
         skills: Dict[str, List[Dict[str, Any]]] = {}
         for row in self.relational_reader["PassiveTreeExpansionSkills.dat64"]:
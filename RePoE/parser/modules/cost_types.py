@@ -3,6 +3,12 @@ from RePoE.parser import Parser_Module
 
 
 class cost_types(Parser_Module):
+    produces = ["cost_types"]
+    tables = {
+        "CostTypes.dat64": ["Id", "StatsKey", "FormatText"],
+        "Stats.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         root = {}
         for row in self.relational_reader["CostTypes.dat64"]:
@@ -9,6 +9,17 @@ from typing import Union
 
 
 class crafting_bench_options(Parser_Module):
+    produces = ["crafting_bench_options"]
+    tables = {
+        "CraftingBenchOptions.dat64": None,
+        "CraftingItemClassCategories.dat64": ["ItemClasses"],
+        "ItemClasses.dat64": ["Id"],
+        "HideoutNPCs.dat64": ["Hideout_NPCsKey"],
+        "NPCs.dat64": ["Name"],
+        "BaseItemTypes.dat64": ["Id"],
+        "Mods.dat64": ["Id"],
+    }
+
     @staticmethod
     def _get_actions(row: DatRecord) -> Union[Dict[str, int], Dict[str, str]]:
         actions = {}
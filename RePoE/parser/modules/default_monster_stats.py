@@ -3,6 +3,11 @@ from RePoE.parser.util import write_json, call_with_default_args
 
 
 class default_monster_stats(Parser_Module):
+    produces = ["default_monster_stats"]
+    tables = {
+        "DefaultMonsterStats.dat64": ["DisplayLevel", "Damage", "Evasion", "Accuracy", "Life", "AllyLife", "Armour"],
+    }
+
     def write(self) -> None:
         root = {}
         for row in self.relational_reader["DefaultMonsterStats.dat64"]:
@@ -33,6 +33,42 @@ def _convert_mods(row: DatRecord) -> Dict[str, str]:
 
 
 class essences(Parser_Module):
+    produces = ["essences"]
+    tables = {
+        "Essences.dat64": [
+            "BaseItemTypesKey",
+            "DropLevel",
+            "Level",
+            "ItemLevelRestriction",
+            "EssenceTypeKey",
+            "Amulet_ModsKey",
+            "Belt_ModsKey",
+            "BodyArmour_ModsKey",
+            "Boots_ModsKey",
+            "Bow_ModsKey",
+            "Claw_ModsKey",
+            "Dagger_ModsKey",
+            "Gloves_ModsKey",
+            "Helmet_ModsKey",
+            "OneHandAxe_ModsKey",
+            "OneHandMace_ModsKey",
+            "OneHandSword_ModsKey",
+            "Display_Quiver_ModsKey",
+            "Ring_ModsKey",
+            "Sceptre_ModsKey",
+            "Shield_ModsKey",
+            "Staff_ModsKey",
+            "OneHandThrustingSword_ModsKey",
+            "TwoHandAxe_ModsKey",
+            "TwoHandMace_ModsKey",
+            "TwoHandSword_ModsKey",
+            "Wand_ModsKey",
+        ],
+        "BaseItemTypes.dat64": ["Id", "Name"],
+        "EssenceType.dat64": ["EssenceType", "IsCorruptedEssence"],
+        "Mods.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         essences = {
             row["BaseItemTypesKey"]["Id"]: {
@@ -1,15 +1,22 @@
-from RePoE.parser.util import write_json, call_with_default_args
+from RePoE.parser.util import write_json, write_ndjson, call_with_default_args
 from RePoE.parser import Parser_Module
 
 
 class flavour(Parser_Module):
+    produces = ["flavour"]
+    tables = {
+        "FlavourText.dat64": ["Id", "Text"],
+    }
+
     def write(self) -> None:
         root = {}
-        for flavour in self.relational_reader["FlavourText.dat64"]:
-            if flavour["Id"] in root:
-                print("Duplicate flavour id:", flavour["Id"])
-            else:
-                root[flavour["Id"]] = flavour["Text"]
+        with write_ndjson(self.data_path, "flavour") as write_row:
+            for flavour in self.relational_reader["FlavourText.dat64"]:
+                if flavour["Id"] in root:
+                    print("Duplicate flavour id:", flavour["Id"])
+                else:
+                    root[flavour["Id"]] = flavour["Text"]
+                    write_row(flavour["Id"], flavour["Text"])
 
         write_json(root, self.data_path, "flavour")
 
@@ -3,6 +3,34 @@ from RePoE.parser.util import write_json, call_with_default_args
 
 
 class fossils(Parser_Module):
+    produces = ["fossils"]
+    tables = {
+        "DelveCraftingModifiers.dat64": [
+            "BaseItemTypesKey",
+            "AddedModsKeys",
+            "ForcedAddModsKeys",
+            "NegativeWeight_TagsKeys",
+            "NegativeWeight_Values",
+            "Weight_TagsKeys",
+            "Weight_Values",
+            "ForbiddenDelveCraftingTagsKeys",
+            "AllowedDelveCraftingTagsKeys",
+            "CorruptedEssenceChance",
+            "CanMirrorItem",
+            "CanImproveQuality",
+            "HasLuckyRolls",
+            "CanRollWhiteSockets",
+            "SellPrice_ModsKeys",
+            "DelveCraftingModifierDescriptionsKeys",
+            "BlockedDelveCraftingModifierDescriptionsKeys",
+        ],
+        "BaseItemTypes.dat64": ["Id", "Name"],
+        "Mods.dat64": ["Id"],
+        "Tags.dat64": ["Id"],
+        "DelveCraftingTags.dat64": ["TagsKey"],
+        "DelveCraftingModifierDescriptions.dat64": ["Id", "Description"],
+    }
+
     def write(self) -> None:
         root = {}
         for row in self.relational_reader["DelveCraftingModifiers.dat64"]:
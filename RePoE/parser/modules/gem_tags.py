@@ -3,6 +3,11 @@ from RePoE.parser.util import write_json, call_with_default_args
 
 
 class gem_tags(Parser_Module):
+    produces = ["gem_tags"]
+    tables = {
+        "GemTags.dat64": ["Id", "Tag"],
+    }
+
     def write(self) -> None:
         root = {}
         for tag in self.relational_reader["GemTags.dat64"]:
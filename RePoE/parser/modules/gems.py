@@ -9,7 +9,14 @@ from PyPoE.poe.sim.formula import GemTypes, gem_stat_requirement
 
 from RePoE.parser import Parser_Module
 from RePoE.parser.constants import COOLDOWN_BYPASS_TYPES
-from RePoE.parser.util import call_with_default_args, get_release_state, get_stat_translation_file_name, write_json
+from RePoE.parser.util import (
+    call_with_default_args,
+    get_release_state,
+    get_stat_translation_file_name,
+    write_json,
+    write_json_shards,
+    write_ndjson,
+)
 
 
 def _handle_dict(representative: Dict[str, Any], per_level: List[Dict[str, Any]]):
@@ -434,6 +441,8 @@ class GemConverter:
 
 
 class gems(Parser_Module):
+    produces = ["gems", "gems_minimal"]
+
     def write(self) -> None:
         gems: dict[str, dict] = {}
         skill_gems = []
@@ -457,43 +466,45 @@ class gems(Parser_Module):
                 rewards[rowid]["classes"].append(character["Name"])
 
         # Skills from gems
-        for gem in relational_reader["SkillGems.dat64"]:
-            for gem_effect in gem["GemEffects"]:
-                if (gem_effect["Name"] and ("[DNT]" in gem_effect["Name"])) or (
-                    gem_effect["ItemColor"] != 3 and gem["IsVaalVariant"]
-                ):
-                    continue
+        with write_ndjson(self.data_path, "gems_minimal") as write_row:
+            for gem in relational_reader["SkillGems.dat64"]:
+                for gem_effect in gem["GemEffects"]:
+                    if (gem_effect["Name"] and ("[DNT]" in gem_effect["Name"])) or (
+                        gem_effect["ItemColor"] != 3 and gem["IsVaalVariant"]
+                    ):
+                        continue
 
-                granted_effect = gem_effect["GrantedEffect"]
-                ge_id = granted_effect["Id"]
-                if ge_id in gems:
-                    print("Duplicate GrantedEffectsKey.Id '%s'" % ge_id)
-                multipliers = {
-                    "str": gem["StrengthRequirementPercent"],
-                    "dex": gem["DexterityRequirementPercent"],
-                    "int": gem["IntelligenceRequirementPercent"],
-                }
-                gems[ge_id] = converter.convert(
-                    gem["BaseItemTypesKey"],
-                    granted_effect,
-                    gem_effect["GrantedEffect2"],
-                    gem_effect["GemTags"],
-                    multipliers,
-                    xp.get(gem["ItemExperienceType"].rowid),
-                    rewards.get(gem["BaseItemTypesKey"].rowid),
-                    gem["ItemExperienceType"]["Id"],
-                    gem_effect,
-                )
-                skill_gems.append({k: gems[ge_id][k] for k in gems[ge_id] if k != "per_level"})
-
-                # Secondary skills from gems. This adds the support skill implicitly provided by Bane
-                granted_effect = gem_effect["GrantedEffect2"]
-                if not granted_effect:
-                    continue
-                ge_id = granted_effect["Id"]
-                if ge_id in gems:
-                    continue
-                gems[ge_id] = converter.convert(None, granted_effect, gem_effect=gem_effect)
+                    granted_effect = gem_effect["GrantedEffect"]
+                    ge_id = granted_effect["Id"]
+                    if ge_id in gems:
+                        print("Duplicate GrantedEffectsKey.Id '%s'" % ge_id)
+                    multipliers = {
+                        "str": gem["StrengthRequirementPercent"],
+                        "dex": gem["DexterityRequirementPercent"],
+                        "int": gem["IntelligenceRequirementPercent"],
+                    }
+                    gems[ge_id] = converter.convert(
+                        gem["BaseItemTypesKey"],
+                        granted_effect,
+                        gem_effect["GrantedEffect2"],
+                        gem_effect["GemTags"],
+                        multipliers,
+                        xp.get(gem["ItemExperienceType"].rowid),
+                        rewards.get(gem["BaseItemTypesKey"].rowid),
+                        gem["ItemExperienceType"]["Id"],
+                        gem_effect,
+                    )
+                    skill_gems.append({k: gems[ge_id][k] for k in gems[ge_id] if k != "per_level"})
+                    write_row(ge_id, skill_gems[-1])
+
+                    # Secondary skills from gems. This adds the support skill implicitly provided by Bane
+                    granted_effect = gem_effect["GrantedEffect2"]
+                    if not granted_effect:
+                        continue
+                    ge_id = granted_effect["Id"]
+                    if ge_id in gems:
+                        continue
+                    gems[ge_id] = converter.convert(None, granted_effect, gem_effect=gem_effect)
 
         # Skills from mods
         for mod in relational_reader["Mods.dat64"]:
@@ -515,6 +526,7 @@ class gems(Parser_Module):
             gems[ge_id] = converter.convert(None, granted_effect)
 
         write_json(gems, self.data_path, "gems")
+        write_json_shards(gems, self.data_path, "gems", lambda ge_id, _: ge_id)
         write_json(skill_gems, self.data_path, "gems_minimal")
 
 
@@ -5,6 +5,14 @@ influences = ["shaper", "elder", "crusader", "eyrie", "basilisk", "adjudicator"]
 
 
 class item_classes(Parser_Module):
+    produces = ["item_classes"]
+    tables = {
+        "InfluenceTags.dat64": ["ItemClass", "Tag"],
+        "ItemClasses.dat64": ["Id", "Name", "ItemClassCategory"],
+        "ItemClassCategories.dat64": ["Id", "Text"],
+        "Tags.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         influences = {}
         for row in self.relational_reader["InfluenceTags.dat64"]:
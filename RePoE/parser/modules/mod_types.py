@@ -3,6 +3,12 @@ from RePoE.parser import Parser_Module
 
 
 class mod_types(Parser_Module):
+    produces = ["mod_types"]
+    tables = {
+        "ModType.dat64": ["Name", "ModSellPriceTypesKeys"],
+        "ModSellPriceTypes.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         mod_types = {
             row["Name"]: {
@@ -6,7 +6,7 @@ from PyPoE.poe.file.translations import install_data_dependant_quantifiers, Tran
 from PyPoE.poe.sim.mods import get_translation
 
 from RePoE.parser import Parser_Module
-from RePoE.parser.util import call_with_default_args, write_json
+from RePoE.parser.util import call_with_default_args, write_json, write_json_shards, write_ndjson
 
 
 def _convert_stats(
@@ -66,37 +66,42 @@ def _convert_tags_keys(tags_keys: List[DatRecord]) -> List[str]:
 
 
 class mods(Parser_Module):
+    produces = ["mods"]
+
     def write(self) -> None:
         root = {}
         translation_cache = self.get_cache(TranslationFileCache)
         install_data_dependant_quantifiers(self.relational_reader)
-        for mod in self.relational_reader["Mods.dat64"]:
-            domain = MOD_DOMAIN_FIX.get(mod["Id"], mod["Domain"])
-
-            lines = get_translation(mod, translation_cache).lines
-
-            obj = {
-                "required_level": mod["Level"],
-                "stats": _convert_stats(mod["Stats"]),
-                "text": "\n".join(lines) if lines else None,
-                "domain": domain.name.lower(),
-                "name": mod["Name"],
-                "type": mod["ModTypeKey"]["Name"],
-                "generation_type": mod["GenerationType"].name.lower() if mod["GenerationType"] else "<unknown>",
-                "groups": [family["Id"] for family in mod["Families"]],
-                "spawn_weights": _convert_spawn_weights(mod["SpawnWeight"]),
-                "generation_weights": _convert_generation_weights(mod["GenerationWeight"]),
-                "grants_effects": _convert_granted_effects(mod["GrantedEffectsPerLevelKeys"]),
-                "is_essence_only": mod["IsEssenceOnlyModifier"] > 0,
-                "adds_tags": _convert_tags_keys(mod["TagsKeys"]),
-                "implicit_tags": _convert_tags_keys(mod["ImplicitTagsKeys"]),
-            }
-            if mod["Id"] in root:
-                print("Duplicate mod id:", mod["Id"])
-            else:
-                root[mod["Id"]] = obj
+        with write_ndjson(self.data_path, "mods") as write_row:
+            for mod in self.relational_reader["Mods.dat64"]:
+                domain = MOD_DOMAIN_FIX.get(mod["Id"], mod["Domain"])
+
+                lines = get_translation(mod, translation_cache).lines
+
+                obj = {
+                    "required_level": mod["Level"],
+                    "stats": _convert_stats(mod["Stats"]),
+                    "text": "\n".join(lines) if lines else None,
+                    "domain": domain.name.lower(),
+                    "name": mod["Name"],
+                    "type": mod["ModTypeKey"]["Name"],
+                    "generation_type": mod["GenerationType"].name.lower() if mod["GenerationType"] else "<unknown>",
+                    "groups": [family["Id"] for family in mod["Families"]],
+                    "spawn_weights": _convert_spawn_weights(mod["SpawnWeight"]),
+                    "generation_weights": _convert_generation_weights(mod["GenerationWeight"]),
+                    "grants_effects": _convert_granted_effects(mod["GrantedEffectsPerLevelKeys"]),
+                    "is_essence_only": mod["IsEssenceOnlyModifier"] > 0,
+                    "adds_tags": _convert_tags_keys(mod["TagsKeys"]),
+                    "implicit_tags": _convert_tags_keys(mod["ImplicitTagsKeys"]),
+                }
+                if mod["Id"] in root:
+                    print("Duplicate mod id:", mod["Id"])
+                else:
+                    root[mod["Id"]] = obj
+                    write_row(mod["Id"], obj)
 
         write_json(root, self.data_path, "mods")
+        write_json_shards(root, self.data_path, "mods", lambda _, mod: f"{mod['domain']}/{mod['generation_type']}")
 
 
 # a few unique item mods have the wrong mod domain so they wouldn't be added to the file without this
@@ -1,11 +1,15 @@
 import json
 from collections import OrderedDict
 
-import requests
-
-
 from RePoE.parser import Parser_Module
-from RePoE.parser.util import call_with_default_args, write_json
+from RePoE.parser.snapshots import load_snapshot
+from RePoE.parser.util import DEFAULT_CACHE_DIR, call_with_default_args, write_json
+
+SYNTHESIS_MODS_URL = (
+    "https://www.poewiki.net/index.php?title=Special:CargoExport&tables=synthesis_mods&format=json"
+    "&fields=synthesis_mods.item_class_ids__full%3Ditem_classes%2C+synthesis_mods.mod_ids__full%3Dmods"
+    "&group+by=synthesis_mods.mod_ids__full%2Csynthesis_mods.item_class_ids__full&order+by=&limit=2000"
+)
 
 include_classes = set(
     [
@@ -27,7 +31,21 @@ include_classes = set(
 )
 
 
+def _validate_synthesis_mods(content: bytes) -> None:
+    if not isinstance(json.loads(content), list):
+        raise ValueError(content[:200])
+
+
 class mods_by_base(Parser_Module):
+    produces = ["mods_by_base"]
+    consumes = ["base_items", "item_classes", "mods"]
+    incremental = False
+    tables = {
+        "Essences.dat64": None,
+        "BaseItemTypes.dat64": ["Name"],
+        "Mods.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         root = {}
 
@@ -85,11 +103,14 @@ class mods_by_base(Parser_Module):
                         if restart:
                             break
 
-        for synth in requests.get(
-            "https://www.poewiki.net/index.php?title=Special:CargoExport&tables=synthesis_mods&format=json"
-            "&fields=synthesis_mods.item_class_ids__full%3Ditem_classes%2C+synthesis_mods.mod_ids__full%3Dmods"
-            "&group+by=synthesis_mods.mod_ids__full%2Csynthesis_mods.item_class_ids__full&order+by=&limit=2000"
-        ).json():
+        synthesis_mods = load_snapshot(
+            "synthesis_mods",
+            SYNTHESIS_MODS_URL,
+            self.cache_dir or DEFAULT_CACHE_DIR,
+            self.offline,
+            validate=_validate_synthesis_mods,
+        )
+        for synth in json.loads(synthesis_mods):
             for item_class in synth["item_classes"]:
                 results: dict[str, dict] = root[item_classes[item_class]["name"]].setdefault("synthesis", {})
                 for mod_id in synth["mods"]:
@@ -0,0 +1,340 @@
+import glob
+import json
+import os
+import sqlite3
+from itertools import zip_longest
+from typing import Any, Dict, Iterable, List, Tuple
+
+from RePoE.parser import Parser_Module
+from RePoE.parser.output import write_if_changed
+from RePoE.parser.profiling import phase
+from RePoE.parser.util import call_with_default_args
+
+DATABASE_FILE = "repoe.sqlite"
+
+SCHEMA = """
+CREATE TABLE mods (
+    id TEXT PRIMARY KEY, name TEXT, domain TEXT, generation_type TEXT, type TEXT, required_level INTEGER,
+    is_essence_only INTEGER, text TEXT, data TEXT
+);
+CREATE TABLE mod_stats (mod_id TEXT, position INTEGER, stat_id TEXT, min INTEGER, max INTEGER);
+CREATE TABLE mod_spawn_weights (mod_id TEXT, position INTEGER, tag TEXT, weight INTEGER);
+CREATE TABLE mod_generation_weights (mod_id TEXT, position INTEGER, tag TEXT, weight INTEGER);
+CREATE TABLE mod_tags (mod_id TEXT, kind TEXT, tag TEXT);
+CREATE TABLE mod_groups (mod_id TEXT, group_id TEXT);
+CREATE TABLE mod_granted_effects (mod_id TEXT, granted_effect_id TEXT, level INTEGER);
+
+CREATE TABLE base_items (
+    id TEXT PRIMARY KEY, name TEXT, item_class TEXT, domain TEXT, drop_level INTEGER, release_state TEXT, data TEXT
+);
+CREATE TABLE base_item_tags (base_item_id TEXT, tag TEXT);
+CREATE TABLE base_item_implicits (base_item_id TEXT, mod_id TEXT);
+
+CREATE TABLE stats (
+    id TEXT PRIMARY KEY, is_local INTEGER, is_aliased INTEGER, main_hand_alias TEXT, off_hand_alias TEXT
+);
+
+CREATE TABLE gems (
+    id TEXT PRIMARY KEY, display_name TEXT, base_item_id TEXT, is_support INTEGER, color TEXT,
+    stat_translation_file TEXT, data TEXT
+);
+CREATE TABLE gem_tags (gem_id TEXT, tag TEXT);
+CREATE TABLE gem_levels (gem_id TEXT, level INTEGER, required_level INTEGER, data TEXT, PRIMARY KEY (gem_id, level));
+CREATE TABLE gem_level_stats (gem_id TEXT, level INTEGER, stat_id TEXT, value REAL, type TEXT);
+
+CREATE TABLE essences (
+    id TEXT PRIMARY KEY, name TEXT, level INTEGER, tier INTEGER, is_corruption_only INTEGER, spawn_level_min INTEGER,
+    item_level_restriction INTEGER
+);
+CREATE TABLE essence_mods (essence_id TEXT, item_class TEXT, mod_id TEXT);
+
+CREATE TABLE fossils (id TEXT PRIMARY KEY, name TEXT, data TEXT);
+CREATE TABLE fossil_mod_weights (fossil_id TEXT, tag TEXT, weight INTEGER, kind TEXT);
+CREATE TABLE fossil_tags (fossil_id TEXT, kind TEXT, tag TEXT);
+CREATE TABLE fossil_mods (fossil_id TEXT, kind TEXT, mod_id TEXT);
+
+CREATE TABLE crafting_bench_options (id INTEGER PRIMARY KEY, master TEXT, bench_tier INTEGER, mod_id TEXT, data TEXT);
+CREATE TABLE crafting_bench_item_classes (option_id INTEGER, item_class TEXT);
+CREATE TABLE crafting_bench_costs (option_id INTEGER, item_id TEXT, amount INTEGER);
+
+CREATE TABLE stat_translations (id INTEGER PRIMARY KEY, file TEXT, position INTEGER, hidden INTEGER);
+CREATE TABLE stat_translation_ids (translation_id INTEGER, position INTEGER, stat_id TEXT);
+CREATE TABLE stat_translation_strings (
+    translation_id INTEGER, language TEXT, position INTEGER, string TEXT, condition TEXT, format TEXT,
+    index_handlers TEXT
+);
+CREATE TABLE trade_stats (translation_id INTEGER, trade_id TEXT, type TEXT, text TEXT);
+"""
+
+# created after the rows are inserted, which is faster than updating them with each row
+INDEXES = """
+CREATE INDEX mods_domain ON mods (domain, generation_type);
+CREATE INDEX mods_generation_type ON mods (generation_type);
+CREATE INDEX mod_stats_stat_id ON mod_stats (stat_id);
+CREATE INDEX mod_stats_mod_id ON mod_stats (mod_id);
+CREATE INDEX mod_spawn_weights_tag ON mod_spawn_weights (tag, weight);
+CREATE INDEX mod_spawn_weights_mod_id ON mod_spawn_weights (mod_id);
+CREATE INDEX mod_generation_weights_tag ON mod_generation_weights (tag);
+CREATE INDEX mod_generation_weights_mod_id ON mod_generation_weights (mod_id);
+CREATE INDEX mod_tags_tag ON mod_tags (tag);
+CREATE INDEX mod_tags_mod_id ON mod_tags (mod_id);
+CREATE INDEX mod_groups_group_id ON mod_groups (group_id);
+CREATE INDEX mod_groups_mod_id ON mod_groups (mod_id);
+CREATE INDEX mod_granted_effects_granted_effect_id ON mod_granted_effects (granted_effect_id);
+CREATE INDEX base_items_item_class ON base_items (item_class);
+CREATE INDEX base_item_tags_tag ON base_item_tags (tag);
+CREATE INDEX base_item_tags_base_item_id ON base_item_tags (base_item_id);
+CREATE INDEX base_item_implicits_mod_id ON base_item_implicits (mod_id);
+CREATE INDEX gems_base_item_id ON gems (base_item_id);
+CREATE INDEX gem_tags_tag ON gem_tags (tag);
+CREATE INDEX gem_level_stats_stat_id ON gem_level_stats (stat_id);
+CREATE INDEX gem_level_stats_gem_id ON gem_level_stats (gem_id, level);
+CREATE INDEX essence_mods_mod_id ON essence_mods (mod_id);
+CREATE INDEX essence_mods_essence_id ON essence_mods (essence_id);
+CREATE INDEX fossil_mod_weights_tag ON fossil_mod_weights (tag);
+CREATE INDEX fossil_tags_tag ON fossil_tags (tag);
+CREATE INDEX fossil_mods_mod_id ON fossil_mods (mod_id);
+CREATE INDEX crafting_bench_options_mod_id ON crafting_bench_options (mod_id);
+CREATE INDEX crafting_bench_item_classes_item_class ON crafting_bench_item_classes (item_class);
+CREATE INDEX stat_translations_file ON stat_translations (file);
+CREATE INDEX stat_translation_ids_stat_id ON stat_translation_ids (stat_id);
+CREATE INDEX stat_translation_strings_translation_id ON stat_translation_strings (translation_id);
+CREATE INDEX trade_stats_trade_id ON trade_stats (trade_id);
+CREATE INDEX trade_stats_translation_id ON trade_stats (translation_id);
+"""
+
+Rows = Dict[str, List[Tuple]]
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), sort_keys=True)
+
+
+def _merge(static: Any, level: Any) -> Any:
+    """merges the static and per_level values of a gem as described in docs/gems.md"""
+    if static is None:
+        return level
+    if level is None:
+        return static
+    if isinstance(static, dict) and isinstance(level, dict):
+        return {k: _merge(static.get(k), level.get(k)) for k in static.keys() | level.keys()}
+    if isinstance(static, list) and isinstance(level, list):
+        return [_merge(s, v) for s, v in zip_longest(static, level)]
+    return level
+
+
+def _add_mods(rows: Rows, mods: Dict[str, Dict[str, Any]]) -> None:
+    for mod_id, mod in mods.items():
+        rows["mods"].append(
+            (
+                mod_id,
+                mod.get("name"),
+                mod["domain"],
+                mod["generation_type"],
+                mod.get("type"),
+                mod.get("required_level"),
+                mod.get("is_essence_only"),
+                mod.get("text"),
+                _json(mod),
+            )
+        )
+        for i, stat in enumerate(mod.get("stats", [])):
+            rows["mod_stats"].append((mod_id, i, stat["id"], stat.get("min"), stat.get("max")))
+        for i, weight in enumerate(mod.get("spawn_weights", [])):
+            rows["mod_spawn_weights"].append((mod_id, i, weight["tag"], weight["weight"]))
+        for i, weight in enumerate(mod.get("generation_weights", [])):
+            rows["mod_generation_weights"].append((mod_id, i, weight["tag"], weight["weight"]))
+        for kind in ["adds_tags", "implicit_tags"]:
+            rows["mod_tags"].extend((mod_id, kind, tag) for tag in mod.get(kind, []))
+        rows["mod_groups"].extend((mod_id, group) for group in mod.get("groups", []))
+        for effect in mod.get("grants_effects") or []:
+            rows["mod_granted_effects"].append((mod_id, effect["granted_effect_id"], effect["level"]))
+
+
+def _add_base_items(rows: Rows, base_items: Dict[str, Dict[str, Any]]) -> None:
+    for base_id, base in base_items.items():
+        rows["base_items"].append(
+            (
+                base_id,
+                base.get("name"),
+                base["item_class"],
+                base["domain"],
+                base.get("drop_level"),
+                base.get("release_state"),
+                _json(base),
+            )
+        )
+        rows["base_item_tags"].extend((base_id, tag) for tag in base.get("tags", []))
+        rows["base_item_implicits"].extend((base_id, mod_id) for mod_id in base.get("implicits", []))
+
+
+def _add_stats(rows: Rows, stats: Dict[str, Dict[str, Any]]) -> None:
+    for stat_id, stat in stats.items():
+        alias = stat.get("alias", {})
+        rows["stats"].append(
+            (
+                stat_id,
+                stat["is_local"],
+                stat["is_aliased"],
+                alias.get("when_in_main_hand"),
+                alias.get("when_in_off_hand"),
+            )
+        )
+
+
+def _add_gems(rows: Rows, gems: Dict[str, Dict[str, Any]]) -> None:
+    for gem_id, gem in gems.items():
+        base_item = gem.get("base_item") or {}
+        per_level = gem.get("per_level", {})
+        rows["gems"].append(
+            (
+                gem_id,
+                gem.get("display_name"),
+                base_item.get("id"),
+                gem["is_support"],
+                gem.get("color"),
+                gem.get("stat_translation_file"),
+                _json({k: v for k, v in gem.items() if k != "per_level"}),
+            )
+        )
+        rows["gem_tags"].extend((gem_id, tag) for tag in gem.get("tags") or [])
+        for level, values in per_level.items():
+            merged = _merge(gem.get("static", {}), values)
+            rows["gem_levels"].append((gem_id, int(level), merged.get("required_level"), _json(merged)))
+            for stat in merged.get("stats", []):
+                if stat is not None:
+                    rows["gem_level_stats"].append((gem_id, int(level), stat["id"], stat["value"], stat.get("type")))
+
+
+def _add_essences(rows: Rows, essences: Dict[str, Dict[str, Any]]) -> None:
+    for essence_id, essence in essences.items():
+        rows["essences"].append(
+            (
+                essence_id,
+                essence["name"],
+                essence["level"],
+                essence["type"]["tier"],
+                essence["type"]["is_corruption_only"],
+                essence.get("spawn_level_min"),
+                essence.get("item_level_restriction"),
+            )
+        )
+        rows["essence_mods"].extend((essence_id, c, mod_id) for c, mod_id in essence["mods"].items())
+
+
+def _add_fossils(rows: Rows, fossils: Dict[str, Dict[str, Any]]) -> None:
+    for fossil_id, fossil in fossils.items():
+        rows["fossils"].append((fossil_id, fossil["name"], _json(fossil)))
+        for kind in ["positive", "negative"]:
+            for weight in fossil[kind + "_mod_weights"]:
+                rows["fossil_mod_weights"].append((fossil_id, weight["tag"], weight["weight"], kind))
+        for kind in ["allowed", "forbidden"]:
+            rows["fossil_tags"].extend((fossil_id, kind, tag) for tag in fossil[kind + "_tags"])
+        for kind in ["added_mods", "forced_mods", "sell_price_mods"]:
+            rows["fossil_mods"].extend((fossil_id, kind, mod_id) for mod_id in fossil[kind])
+
+
+def _add_crafting_bench_options(rows: Rows, options: List[Dict[str, Any]]) -> None:
+    for option_id, option in enumerate(options):
+        actions = option["actions"]
+        mod_id = actions.get("add_explicit_mod") or actions.get("add_enchant_mod")
+        rows["crafting_bench_options"].append(
+            (option_id, option.get("master"), option.get("bench_tier"), mod_id, _json(option))
+        )
+        rows["crafting_bench_item_classes"].extend((option_id, c) for c in option.get("item_classes", []))
+        rows["crafting_bench_costs"].extend((option_id, item, amount) for item, amount in option["cost"].items())
+
+
+def _add_stat_translations(rows: Rows, file: str, translations: List[Dict[str, Any]]) -> None:
+    for position, translation in enumerate(translations):
+        translation_id = len(rows["stat_translations"])
+        rows["stat_translations"].append((translation_id, file, position, translation.get("hidden", False)))
+        rows["stat_translation_ids"].extend(
+            (translation_id, i, stat_id) for i, stat_id in enumerate(translation["ids"])
+        )
+        for language, strings in translation.items():
+            if language in ["ids", "hidden", "trade_stats"]:
+                continue
+            for i, string in enumerate(strings):
+                rows["stat_translation_strings"].append(
+                    (
+                        translation_id,
+                        language,
+                        i,
+                        string["string"],
+                        _json(string["condition"]),
+                        _json(string["format"]),
+                        _json(string["index_handlers"]),
+                    )
+                )
+        for trade_stat in translation.get("trade_stats") or []:
+            rows["trade_stats"].append((translation_id, trade_stat["id"], trade_stat["type"], trade_stat["text"]))
+
+
+def create_database(rows: Rows) -> bytes:
+    """the bytes of a database with the rows inserted into the tables of SCHEMA and indexed"""
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.executescript(SCHEMA)
+        for table, table_rows in rows.items():
+            if table_rows:
+                placeholders = ",".join("?" * len(table_rows[0]))
+                connection.executemany(f"INSERT INTO {table} VALUES ({placeholders})", table_rows)
+        connection.executescript(INDEXES)
+        # statistics for the query planner
+        connection.execute("ANALYZE")
+        connection.commit()
+        return connection.serialize()
+    finally:
+        connection.close()
+
+
+class sqlite(Parser_Module):
+    produces = [DATABASE_FILE]
+    consumes = [
+        "mods",
+        "base_items",
+        "stats",
+        "gems",
+        "essences",
+        "fossils",
+        "crafting_bench_options",
+        "stat_translations",
+    ]
+    tables = {}
+
+    def _load(self, name: str) -> Any:
+        with open(self.data_path + name + ".min.json") as f:
+            return json.load(f)
+
+    def _translation_files(self) -> Iterable[str]:
+        yield "stat_translations"
+        for path in sorted(glob.glob(os.path.join(self.data_path, "stat_translations", "*.min.json"))):
+            yield "stat_translations/" + os.path.basename(path)[: -len(".min.json")]
+
+    def write(self) -> None:
+        rows: Rows = {table: [] for table in _table_names()}
+        _add_mods(rows, self._load("mods"))
+        _add_base_items(rows, self._load("base_items"))
+        _add_stats(rows, self._load("stats"))
+        _add_gems(rows, self._load("gems"))
+        _add_essences(rows, self._load("essences"))
+        _add_fossils(rows, self._load("fossils"))
+        _add_crafting_bench_options(rows, self._load("crafting_bench_options"))
+        for file in self._translation_files():
+            _add_stat_translations(rows, file, self._load(file))
+
+        with phase("serialize"):
+            print("Writing '" + DATABASE_FILE + "' ...", end="", flush=True)
+            database = create_database(rows)
+            with write_if_changed(self.data_path + DATABASE_FILE, "wb") as f:
+                f.write(database)
+            print(" Done!")
+
+
+def _table_names() -> List[str]:
+    return [line.split()[2] for line in SCHEMA.splitlines() if line.startswith("CREATE TABLE")]
+
+
+if __name__ == "__main__":
+    call_with_default_args(sqlite)
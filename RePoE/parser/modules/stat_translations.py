@@ -1,6 +1,9 @@
 from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
 import json
 import re
+import traceback
 from typing import Any, Dict, Iterator, List, Set, Tuple, Union
 
 from PyPoE.poe.file.file_system import FileSystem
@@ -14,10 +17,19 @@ from PyPoE.poe.file.translations import (
     get_custom_translation_file,
     install_data_dependant_quantifiers,
 )
-from urllib.request import urlopen, Request
 
-from RePoE.parser import Parser_Module
-from RePoE.parser.util import call_with_default_args, get_stat_translation_file_name, write_json
+from RePoE.parser import Parser_Module, output
+from RePoE.parser.snapshots import load_snapshot
+from RePoE.parser.util import (
+    DEFAULT_CACHE_DIR,
+    call_with_default_args,
+    get_stat_translation_file_name,
+    init_worker,
+    worker,
+    write_json,
+)
+
+TRADE_STATS_URL = "https://www.pathofexile.com/api/trade/data/stats"
 
 
 def _convert_tags(n_ids: int, tags: List[int], tags_types: List[str]) -> List[str]:
@@ -48,6 +60,12 @@ def _convert_range(translation_range: List[TranslationRange]) -> Union[List[Dict
     return rs
 
 
+def _validate_trade_stats(content: bytes) -> None:
+    # the trade api can answer errors with status 200
+    if "result" not in json.loads(content):
+        raise ValueError(content[:200])
+
+
 def _convert_handlers(n_ids: int, index_handlers: Dict) -> Union[List[List[str]], List[List]]:
     hs: List[List[str]] = [[] for _ in range(n_ids)]
     for handler_name, ids in index_handlers.items():
@@ -134,7 +152,45 @@ def _build_stat_translation_file_map(file_system: FileSystem) -> Iterator[Tuple[
             yield game_file, out_file
 
 
+def _write_stat_translations(
+    translation_cache: TranslationFileCache, in_file: str, out_file: str, data_path: str, trade_stats
+) -> Set[str]:
+    tag_set: Set[str] = set()
+    translations = translation_cache[in_file].translations
+    result = _get_stat_translations(tag_set, translations, get_custom_translation_file().translations, trade_stats)
+    write_json(result, data_path, out_file)
+    return tag_set
+
+
+def _init_translation_worker(init_args: Dict[str, Any], trade_stats) -> None:
+    init_worker(**init_args)
+    install_data_dependant_quantifiers(worker["relational_reader"])
+    worker["translation_cache"] = TranslationFileCache(worker["file_system"])
+    worker["trade_stats"] = trade_stats
+    if "recorder" in worker:
+        worker["recorder"].watch(worker["translation_cache"])
+
+
+def _write_stat_translations_in_worker(
+    in_file: str, out_file: str, data_path: str
+) -> Tuple[Set[str], Dict[str, str], Dict[str, int]]:
+    """
+    returns the format tags found, the digests of the game files read if the worker records them and the
+    counts of changed and unchanged files written
+    """
+    recorder = worker.get("recorder")
+    output.take_stats()
+    with recorder.record() if recorder else nullcontext(set()) as paths:
+        tag_set = _write_stat_translations(
+            worker["translation_cache"], in_file, out_file, data_path, worker["trade_stats"]
+        )
+    return tag_set, recorder.get_digests(paths) if recorder else {}, output.take_stats()
+
+
 class stat_translations(Parser_Module):
+    produces = ["stat_value_handlers", "stat_translations"]
+    incremental = False
+
     def write(self) -> None:
         install_data_dependant_quantifiers(self.relational_reader)
 
@@ -167,37 +223,63 @@ class stat_translations(Parser_Module):
                 quantifiers[handler_name] = {"type": handler.type.name.lower()}
         write_json(quantifiers, self.data_path, "stat_value_handlers")
 
-        with urlopen(
-            Request(
-                "https://www.pathofexile.com/api/trade/data/stats",
-                headers={"User-Agent": "OAuth RePoE/1.0.0 (contact: https://github.com/lvlvllvlvllvlvl/RePoE/)"},
+        data = json.loads(
+            load_snapshot(
+                "trade_stats",
+                TRADE_STATS_URL,
+                self.cache_dir or DEFAULT_CACHE_DIR,
+                self.offline,
+                validate=_validate_trade_stats,
             )
-        ) as req:
-            data = json.load(req)
-            if "result" not in data:
-                print(data)
-            trade_stats = defaultdict(list)
-            for trade_stat in [entry for v in data["result"] for entry in v["entries"]]:
-                if "option" in trade_stat:
-                    for option in trade_stat["option"]["options"]:
-                        trade_stats[trade_stat["text"].replace("#", option["text"])].append(trade_stat)
-                else:
-                    trade_stats[trade_stat["text"]].append(trade_stat)
-            for k, v in trade_stats.items():
-                trade_stats[k] = sorted(v, key=lambda v: v.get("id", ""))
+        )
+        trade_stats = defaultdict(list)
+        for trade_stat in [entry for v in data["result"] for entry in v["entries"]]:
+            if "option" in trade_stat:
+                for option in trade_stat["option"]["options"]:
+                    trade_stats[trade_stat["text"].replace("#", option["text"])].append(trade_stat)
+            else:
+                trade_stats[trade_stat["text"]].append(trade_stat)
+        for k, v in trade_stats.items():
+            trade_stats[k] = sorted(v, key=lambda v: v.get("id", ""))
 
         tag_set: Set[str] = set()
-        for in_file, out_file in _build_stat_translation_file_map(self.file_system):
-            try:
-                translations = self.get_cache(TranslationFileCache)[in_file].translations
-                result = _get_stat_translations(
-                    tag_set, translations, get_custom_translation_file().translations, trade_stats
-                )
-                write_json(result, self.data_path, out_file)
-            except Exception:
-                print("Error processing", in_file)
-                # TODO: support markup TranslationQuantifier
-                # raise
+        failed = []
+        file_map = list(_build_stat_translation_file_map(self.file_system))
+        if self.jobs > 1 and self.ggpk_path:
+            with ProcessPoolExecutor(
+                max_workers=self.jobs,
+                initializer=_init_translation_worker,
+                initargs=(worker.get("init_args", {"ggpk_path": self.ggpk_path}), trade_stats),
+            ) as executor:
+                futures: Dict[str, Future] = {
+                    in_file: executor.submit(_write_stat_translations_in_worker, in_file, out_file, self.data_path)
+                    for in_file, out_file in file_map
+                }
+                for in_file, future in futures.items():
+                    try:
+                        tags, digests, output_stats = future.result()
+                        tag_set.update(tags)
+                        output.add_stats(output_stats)
+                        if "recorder" in worker:
+                            worker["recorder"].add(digests)
+                    except Exception as e:
+                        failed.append(in_file)
+                        print("Error processing", in_file)
+                        traceback.print_exception(e)
+        else:
+            translation_cache = self.get_cache(TranslationFileCache)
+            for in_file, out_file in file_map:
+                try:
+                    tag_set.update(
+                        _write_stat_translations(translation_cache, in_file, out_file, self.data_path, trade_stats)
+                    )
+                except Exception as e:
+                    # TODO: support markup TranslationQuantifier
+                    failed.append(in_file)
+                    print("Error processing", in_file)
+                    traceback.print_exception(e)
+        if failed:
+            print("Failed to process {} stat description files: {}".format(len(failed), ", ".join(failed)))
         print("Possible format tags: {}".format(tag_set))
 
 
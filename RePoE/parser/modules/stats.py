@@ -17,6 +17,11 @@ def _convert_alias_stats(
 
 
 class stats(Parser_Module):
+    produces = ["stats"]
+    tables = {
+        "Stats.dat64": ["Id", "IsLocal", "IsWeaponLocal", "MainHandAlias_StatsKey", "OffHandAlias_StatsKey"],
+    }
+
     def write(self) -> None:
         root = {}
         previous: Set[str] = set()
@@ -3,6 +3,11 @@ from RePoE.parser import Parser_Module
 
 
 class tags(Parser_Module):
+    produces = ["tags"]
+    tables = {
+        "Tags.dat64": ["Id"],
+    }
+
     def write(self) -> None:
         tags = [row["Id"] for row in self.relational_reader["Tags.dat64"]]
         write_json(tags, self.data_path, "tags")
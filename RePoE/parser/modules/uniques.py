@@ -1,8 +1,12 @@
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from html import escape
 from time import sleep
+from typing import Any, Dict, List, Optional
 from urllib.parse import quote
 from RePoE.parser import Parser_Module
-from RePoE.parser.util import call_with_default_args, export_image, write_json, write_text
+from RePoE.parser.snapshots import SnapshotUnavailable, load_snapshot
+from RePoE.parser.util import DEFAULT_CACHE_DIR, call_with_default_args, register_image, write_json, write_text
 
 import requests
 
@@ -48,44 +52,99 @@ fields = [
 ]
 
 
-def get_wiki_data():
-    offset = 0
-    # data will be truncated if it's too large, reducing page size can resolve unterminated json errors
-    page_size = 200
-    data = []
+# data will be truncated if it's too large, reducing page size can resolve unterminated json errors
+WIKI_PAGE_SIZE = 200
+# number of pages requested at the same time
+WIKI_WORKERS = 8
+WIKI_RETRIES = 10
+
+
+def _wiki_url(offset: int) -> str:
+    return (
+        "https://www.poewiki.net/w/api.php?action=cargoquery&tables=items&where=rarity=%22Unique%22"
+        f"&fields={','.join(fields)}&limit={WIKI_PAGE_SIZE}&offset={offset}&format=json"
+    )
+
+
+def _validate_wiki_page(content: bytes) -> None:
+    if "cargoquery" not in json.loads(content):
+        raise ValueError(content[:200])
+
+
+def _get_wiki_page(page: int, session: requests.Session, cache_dir: str, offline: bool) -> List[Dict[str, Any]]:
+    """fetches a page of the cargo query, retrying only this page when it fails"""
     errors = 0
     while True:
         try:
-            url = (
-                "https://www.poewiki.net/w/api.php?action=cargoquery&tables=items&where=rarity=%22Unique%22"
-                f"&fields={','.join( fields)}&limit={page_size}&offset={offset}&format=json"
+            content = load_snapshot(
+                f"poewiki_uniques/{page}",
+                _wiki_url(page * WIKI_PAGE_SIZE),
+                cache_dir,
+                offline,
+                session=session,
+                validate=_validate_wiki_page,
             )
-            json = requests.get(url).json()
-        except Exception as e:
-            print("error fetching", url)
-            if errors > 10:
-                raise e
+            return json.loads(content)["cargoquery"]
+        except SnapshotUnavailable:
+            if offline or errors >= WIKI_RETRIES:
+                raise
+            print("error fetching", _wiki_url(page * WIKI_PAGE_SIZE))
             sleep(0.01 * 2**errors)
             errors += 1
-        if "cargoquery" not in json:
-            print(offset, json)
-            return data
-        page = json["cargoquery"]
-        data.extend(page)
-        offset += page_size
-        if len(page) < page_size:
-            result = {}
-            for entry in data:
-                item = entry["title"]
-                name = item["name"]
-                if name not in result:
-                    result[name] = [item]
-                else:
-                    result[name].append(item)
-            return result
+
+
+def get_wiki_data(cache_dir: str = DEFAULT_CACHE_DIR, offline: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    # the number of pages isn't known in advance, keep requesting the next pages until one isn't full
+    pages: Dict[int, List[Dict[str, Any]]] = {}
+    errors: Dict[int, Exception] = {}
+    last_page: Optional[int] = None
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=WIKI_WORKERS) as executor:
+        running = {executor.submit(_get_wiki_page, i, session, cache_dir, offline): i for i in range(WIKI_WORKERS)}
+        next_page = WIKI_WORKERS
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                try:
+                    pages[i] = future.result()
+                except Exception as e:
+                    # only an error if the page turns out to be needed
+                    errors[i] = e
+                    continue
+                if len(pages[i]) < WIKI_PAGE_SIZE:
+                    last_page = i if last_page is None else min(last_page, i)
+                elif last_page is None and not errors:
+                    running[executor.submit(_get_wiki_page, next_page, session, cache_dir, offline)] = next_page
+                    next_page += 1
+    for i, e in sorted(errors.items()):
+        if last_page is None or i <= last_page:
+            raise e
+
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    for i in range(last_page + 1):
+        for entry in pages[i]:
+            item = entry["title"]
+            result.setdefault(item["name"], []).append(item)
+    return result
 
 
 class uniques(Parser_Module):
+    produces = ["uniques", "uniques_poewiki", "uniques.html"]
+    incremental = False
+    tables = {
+        "UniqueStashLayout.dat64": [
+            "WordsKey",
+            "UniqueStashTypesKey",
+            "IsAlternateArt",
+            "RenamedVersion",
+            "BaseVersion",
+            "ItemVisualIdentityKey",
+        ],
+        "Words.dat64": ["Text"],
+        "UniqueStashTypes.dat64": ["Id", "Width", "Height"],
+        "ItemVisualIdentity.dat64": ["Id", "DDSFile"],
+    }
+
     def write(self) -> None:
         root = {}
         html = """<!DOCTYPE html>
@@ -127,7 +186,7 @@ class uniques(Parser_Module):
                 ddsfile: str = item["ItemVisualIdentityKey"]["DDSFile"]
                 name = escape(name) + (" (Alternate Art)" if item["IsAlternateArt"] else "")
                 html = html + f"\n\t<a href='{quote(ddsfile.replace('.dds', '.png'))}'>{name}</a><br>"
-                export_image(ddsfile, self.data_path, self.file_system)
+                register_image(ddsfile)
         html = (
             html
             + """
@@ -137,7 +196,7 @@ class uniques(Parser_Module):
         )
 
         write_json(root, self.data_path, "uniques")
-        write_json(get_wiki_data(), self.data_path, "uniques_poewiki")
+        write_json(get_wiki_data(self.cache_dir or DEFAULT_CACHE_DIR, self.offline), self.data_path, "uniques_poewiki")
         write_text(html, self.data_path, "uniques.html")
 
 
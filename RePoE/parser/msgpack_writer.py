@@ -0,0 +1,49 @@
+from typing import Any, BinaryIO
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# whether write_json also writes a .msgpack file of each object
+enabled = False
+
+
+def configure(write_msgpack: bool = False) -> None:
+    global enabled
+    if write_msgpack and msgpack is None:
+        raise ValueError("MessagePack output needs the msgpack package, install it with 'pip install msgpack'")
+    enabled = write_msgpack
+
+
+def _key(key: Any) -> str:
+    # the same strings json.dump uses for keys, so both formats decode to the same object
+    if isinstance(key, str):
+        return key
+    if key is True:
+        return "true"
+    if key is False:
+        return "false"
+    if key is None:
+        return "null"
+    if isinstance(key, float):
+        return float.__repr__(key)
+    if isinstance(key, int):
+        return int.__repr__(key)
+    raise TypeError(f"keys must be str, int, float, bool or None, not {key.__class__.__name__}")
+
+
+def _prepare(o: Any, minimize: bool) -> Any:
+    """
+    The object with the keys of dicts sorted and converted like json.dump converts them, so the bytes only depend
+    on the content. Like util.minimize, None values are dropped from dicts outside of tuples.
+    """
+    if isinstance(o, dict):
+        return {_key(k): _prepare(v, minimize) for k, v in sorted(o.items()) if v is not None or not minimize}
+    if isinstance(o, (list, tuple)):
+        return [_prepare(v, minimize and not isinstance(o, tuple)) for v in o]
+    return o
+
+
+def write_msgpack(o: Any, out: BinaryIO) -> None:
+    out.write(msgpack.packb(_prepare(o, True), use_bin_type=True))
@@ -0,0 +1,7 @@
+# whether modules of row oriented outputs also write them as json lines, see util.write_ndjson
+enabled = False
+
+
+def configure(write_ndjson: bool = False) -> None:
+    global enabled
+    enabled = write_ndjson
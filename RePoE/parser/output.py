@@ -0,0 +1,59 @@
+import os
+from contextlib import contextmanager
+from hashlib import sha256
+from typing import IO, Dict, Iterator, Optional
+
+CHUNK_SIZE = 1 << 20
+
+# number of files written by this process that changed and that were left alone, see take_stats
+stats: Dict[str, int] = {"changed": 0, "unchanged": 0}
+
+
+def _digest(path: str) -> Optional[str]:
+    if not os.path.isfile(path):
+        return None
+    digest = sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _same_content(a: str, b: str) -> bool:
+    if not os.path.isfile(b) or os.path.getsize(a) != os.path.getsize(b):
+        return False
+    return _digest(a) == _digest(b)
+
+
+@contextmanager
+def write_if_changed(path: str, mode: str = "w", **kwargs) -> Iterator[IO]:
+    """
+    Opens a temporary file next to path for writing. When it is closed without an error it replaces path
+    with an atomic rename, unless the content is the same, in which case the existing file keeps its mtime.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, mode, **kwargs) as f:
+            yield f
+        if _same_content(tmp, path):
+            stats["unchanged"] += 1
+        else:
+            os.replace(tmp, path)
+            stats["changed"] += 1
+    finally:
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+
+
+def add_stats(other: Dict[str, int]) -> None:
+    """adds the counts of files written by another process"""
+    for key, count in other.items():
+        stats[key] = stats.get(key, 0) + count
+
+
+def take_stats() -> Dict[str, int]:
+    """returns the counts since the last call and resets them"""
+    taken = dict(stats)
+    for key in stats:
+        stats[key] = 0
+    return taken
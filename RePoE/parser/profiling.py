@@ -0,0 +1,64 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# phases the time of a module is split into, everything not covered by another phase counts as "convert"
+PHASES = ["load", "convert", "serialize", "images"]
+
+
+def _now() -> Tuple[float, float]:
+    return time.perf_counter(), time.process_time()
+
+
+class Profile:
+    """Accumulates the wall and CPU time spent in each phase, nested phases are not counted for outer ones"""
+
+    def __init__(self) -> None:
+        self.times: Dict[str, List[float]] = {name: [0.0, 0.0] for name in PHASES}
+        self._stack: List[str] = []
+        self._mark = _now()
+
+    def _charge(self) -> None:
+        now = _now()
+        if self._stack:
+            times = self.times[self._stack[-1]]
+            times[0] += now[0] - self._mark[0]
+            times[1] += now[1] - self._mark[1]
+        self._mark = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        self._charge()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge()
+            self._stack.pop()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "wall": round(sum(wall for wall, _ in self.times.values()), 3),
+            "cpu": round(sum(cpu for _, cpu in self.times.values()), 3),
+            "phases": {
+                name: {"wall": round(wall, 3), "cpu": round(cpu, 3)} for name, (wall, cpu) in self.times.items()
+            },
+        }
+
+
+# the profile of the module currently running in this process
+current: Optional[Profile] = None
+
+
+def phase(name: str) -> ContextManager:
+    return current.phase(name) if current is not None else nullcontext()
+
+
+def timed(name: str, function: Callable) -> Callable:
+    """wraps a function to count the time spent in it for the given phase"""
+
+    def timed_function(*args, **kwargs):
+        with phase(name):
+            return function(*args, **kwargs)
+
+    return timed_function
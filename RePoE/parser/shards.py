@@ -0,0 +1,41 @@
+import os
+import re
+from typing import Any, Callable, Dict, Iterable
+
+# whether modules also write their largest outputs split into shards, see util.write_json_shards
+enabled = False
+
+INDEX_NAME = "index"
+# the extensions of the files written for each shard, stale shards are removed with all of them
+EXTENSIONS = [".json", ".min.json", ".msgpack"]
+
+
+def configure(write_shards: bool = False) -> None:
+    global enabled
+    enabled = write_shards
+
+
+def shard_name(value: str) -> str:
+    """a file name for the value, keeping ids and item class names readable"""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value).strip("._") or "_"
+
+
+def group(root: Dict[str, Any], shard_of: Callable[[str, Any], str]) -> Dict[str, Dict[str, Any]]:
+    """the entries of root by the name of the shard they belong to, each name may contain '/' for directories"""
+    shards: Dict[str, Dict[str, Any]] = {}
+    for key, value in root.items():
+        name = "/".join(shard_name(part) for part in shard_of(key, value).split("/"))
+        shards.setdefault(name, {})[key] = value
+    return shards
+
+
+def remove_stale(directory: str, names: Iterable[str]) -> None:
+    """removes the files of shards in the directory that were not written, e.g. of a removed item class"""
+    keep = {os.path.normpath(os.path.join(directory, name + ext)) for name in names for ext in EXTENSIONS}
+    for path, _, files in os.walk(directory, topdown=False):
+        for file in files:
+            file = os.path.normpath(os.path.join(path, file))
+            if file.endswith(tuple(EXTENSIONS)) and file not in keep:
+                os.remove(file)
+        if not os.listdir(path):
+            os.rmdir(path)
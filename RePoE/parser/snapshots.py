@@ -0,0 +1,123 @@
+import json
+import os
+import time
+from hashlib import sha256
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+# seconds a snapshot is used without asking the server whether it changed
+SNAPSHOT_TTL = 6 * 60 * 60
+# number of earlier versions kept next to the current snapshot
+SNAPSHOT_HISTORY = 5
+
+USER_AGENT = "OAuth RePoE/1.0.0 (contact: https://github.com/lvlvllvlvllvlvl/RePoE/)"
+
+
+class SnapshotUnavailable(Exception):
+    pass
+
+
+def _snapshot_dir(cache_dir: str, name: str) -> str:
+    return os.path.join(cache_dir, "snapshots", name)
+
+
+def _read_meta(directory: str) -> Dict[str, Any]:
+    path = os.path.join(directory, "meta.json")
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_meta(directory: str, meta: Dict[str, Any]) -> None:
+    path = os.path.join(directory, "meta.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _read_version(directory: str, digest: Optional[str]) -> Optional[bytes]:
+    if digest is None or not os.path.isfile(os.path.join(directory, digest)):
+        return None
+    with open(os.path.join(directory, digest), "rb") as f:
+        return f.read()
+
+
+def _store_version(directory: str, meta: Dict[str, Any], content: bytes) -> None:
+    digest = sha256(content).hexdigest()
+    path = os.path.join(directory, digest)
+    if not os.path.isfile(path):
+        with open(path + ".tmp", "wb") as f:
+            f.write(content)
+        os.replace(path + ".tmp", path)
+    history = [d for d in meta.get("history", []) if d != digest] + [digest]
+    for old in history[:-SNAPSHOT_HISTORY]:
+        if os.path.isfile(os.path.join(directory, old)):
+            os.remove(os.path.join(directory, old))
+    meta.update(
+        {
+            "current": digest,
+            "history": history[-SNAPSHOT_HISTORY:],
+        }
+    )
+
+
+def load_snapshot(
+    name: str,
+    url: str,
+    cache_dir: str,
+    offline: bool = False,
+    ttl: float = SNAPSHOT_TTL,
+    session: Optional[requests.Session] = None,
+    validate: Optional[Callable[[bytes], Any]] = None,
+) -> bytes:
+    """
+    Returns the content of the url, stored as a snapshot in the cache directory. The snapshot is revalidated
+    with the server once it is older than the ttl and used as is when offline or when the server can't be reached.
+    validate may raise a ValueError to reject a response, which is then handled like a failed request.
+    """
+    directory = _snapshot_dir(cache_dir, name)
+    meta = _read_meta(directory)
+    content = _read_version(directory, meta.get("current")) if meta.get("url") == url else None
+
+    if content is not None and (offline or time.time() - meta.get("checked", 0) < ttl):
+        return content
+    if offline:
+        raise SnapshotUnavailable(f"There is no snapshot of {url} in {directory}, run once without --offline")
+
+    headers = {"User-Agent": USER_AGENT}
+    if content is not None and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if content is not None and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        response = (session or requests).get(url, headers=headers, timeout=60)
+        if response.status_code != 304:
+            response.raise_for_status()
+            if validate is not None:
+                validate(response.content)
+    except (requests.RequestException, ValueError) as e:
+        if content is None:
+            raise SnapshotUnavailable(f"Failed to fetch {url} and there is no snapshot of it") from e
+        print(f"Failed to fetch {url}, using the snapshot from {time.ctime(meta['checked'])}: {e}")
+        return content
+
+    os.makedirs(directory, exist_ok=True)
+    if response.status_code != 304:
+        content = response.content
+        _store_version(directory, meta, content)
+        meta.update({"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")})
+    meta.update({"url": url, "checked": time.time()})
+    _write_meta(directory, meta)
+    return content
+
+
+def save_snapshot(name: str, url: str, cache_dir: str, content: bytes) -> None:
+    """stores the content as the current snapshot of the url, e.g. to reproduce an earlier export"""
+    directory = _snapshot_dir(cache_dir, name)
+    os.makedirs(directory, exist_ok=True)
+    meta = _read_meta(directory)
+    _store_version(directory, meta, content)
+    meta.update({"url": url, "checked": time.time(), "etag": None, "last_modified": None})
+    _write_meta(directory, meta)
@@ -1,18 +1,18 @@
-import io
+import copy
 import json
 import os
-import traceback
 from hashlib import md5
-from io import BytesIO
-from typing import Any, Optional
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
-from PIL import Image
 from PyPoE.poe.file.dat import RelationalReader
 from PyPoE.poe.file.file_system import FileSystem
 from PyPoE.poe.file.specification.data import generated
+from PyPoE.poe.file.specification.fields import Specification
 
-from RePoE import __DATA_PATH__
-from RePoE.parser import Parser_Module
+from RePoE import __DATA_PATH__, __REPOE_DIR__
+from RePoE.parser import Parser_Module, images, json_writer, msgpack_writer, ndjson, shards
+from RePoE.parser.bundle_cache import BundleCache
 from RePoE.parser.constants import (
     LEGACY_ITEMS,
     STAT_DESCRIPTION_NAMING_EXCEPTIONS,
@@ -20,6 +20,10 @@ from RePoE.parser.constants import (
     UNRELEASED_ITEMS,
     ReleaseState,
 )
+from RePoE.parser.dat_cache import DatTableCache
+from RePoE.parser.incremental import InputRecorder
+from RePoE.parser.output import write_if_changed
+from RePoE.parser.profiling import phase
 
 
 def get_id_or_none(relational_file_cell):
@@ -30,17 +34,44 @@ def write_json(
     root_obj: Any,
     data_path: str,
     file_name: str,
+    quiet: bool = False,
 ) -> None:
-    print("Writing '" + str(file_name) + ".json' ...", end="", flush=True)
-    json.dump(root_obj, io.open(data_path + file_name + ".json", mode="w"), indent=2, sort_keys=True)
-    print(" Done!")
-    print("Writing '" + str(file_name) + ".min.json' ...", end="", flush=True)
-    json.dump(
-        minimize(root_obj),
-        io.open(data_path + file_name + ".min.json", mode="w"),
-        separators=(",", ":"),
-        sort_keys=True,
-    )
+    with phase("serialize"):
+        if not quiet:
+            print("Writing '" + str(file_name) + ".json' and '" + str(file_name) + ".min.json' ...", end="", flush=True)
+        with write_if_changed(data_path + file_name + ".json") as pretty, write_if_changed(
+            data_path + file_name + ".min.json"
+        ) as compact:
+            json_writer.write_json_files(root_obj, pretty, compact, file_name)
+        if msgpack_writer.enabled:
+            with write_if_changed(data_path + file_name + ".msgpack", "wb") as out:
+                msgpack_writer.write_msgpack(root_obj, out)
+        if not quiet:
+            print(" Done!")
+
+
+def write_json_shards(
+    root_obj: Dict[str, Any],
+    data_path: str,
+    file_name: str,
+    shard_of: Callable[[str, Any], str],
+) -> None:
+    """
+    With --shards, also writes the entries of root_obj split into the files named by shard_of in the directory
+    file_name, and file_name/index mapping each key to its shard, so clients can load single entries.
+    """
+    if not shards.enabled:
+        return
+    grouped = shards.group(root_obj, shard_of)
+    print(f"Writing {len(grouped)} shards of '{file_name}' ...", end="", flush=True)
+    directory = os.path.join(data_path, file_name)
+    index = {}
+    for name, entries in grouped.items():
+        os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok=True)
+        write_json(entries, data_path, f"{file_name}/{name}", quiet=True)
+        index.update((key, f"{file_name}/{name}") for key in entries)
+    write_json(index, data_path, f"{file_name}/{shards.INDEX_NAME}", quiet=True)
+    shards.remove_stale(directory, [*grouped, shards.INDEX_NAME])
     print(" Done!")
 
 
@@ -53,40 +84,168 @@ def minimize(value):
         return value
 
 
+@contextmanager
+def write_ndjson(data_path: str, file_name: str) -> Iterator[Callable[[Any, Any], None]]:
+    """
+    With --ndjson, yields a function writing a key and its value as a line of file_name.ndjson, so modules can
+    write rows as they convert them. Values are minimized like in the .min.json file. Does nothing otherwise.
+    """
+    if not ndjson.enabled:
+        yield lambda key, value: None
+        return
+    print("Streaming '" + str(file_name) + ".ndjson' ...")
+    with write_if_changed(data_path + file_name + ".ndjson") as out:
+
+        def write_row(key: Any, value: Any) -> None:
+            out.write(json.dumps([key, minimize(value)], sort_keys=True, separators=(",", ":")) + "\n")
+
+        yield write_row
+
+
 def write_text(
     text: str,
     data_path: str,
     file_name: str,
 ) -> None:
-    print("Writing '" + str(file_name) + "' ...", end="", flush=True)
-    with io.open(data_path + file_name, mode="w") as out:
-        out.write(text)
-    print(" Done!")
+    with phase("serialize"):
+        print("Writing '" + str(file_name) + "' ...", end="", flush=True)
+        with write_if_changed(data_path + file_name) as out:
+            out.write(text)
+        print(" Done!")
 
 
-def load_file_system(ggpk_path: str) -> FileSystem:
+def load_file_system(ggpk_path: str, cache_dir: Optional[str] = None) -> FileSystem:
+    """with a cache directory, files fetched from a patch server or directory are kept there and reused"""
+    if cache_dir is not None:
+        ggpk_path = BundleCache(cache_dir, ggpk_path).serve()
     return FileSystem(ggpk_path)
 
 
-def create_relational_reader(file_system: FileSystem) -> RelationalReader:
+# file system and relational reader of a worker process, see init_worker
+worker: Dict[str, Any] = {}
+
+
+def init_worker(
+    ggpk_path: str,
+    record_inputs: bool = False,
+    dat_cache_dir: Optional[str] = None,
+    tables: Optional[Dict[str, Optional[List[str]]]] = None,
+    bundle_cache_dir: Optional[str] = None,
+    json_backend: str = "python",
+    json_conformance: bool = False,
+    write_msgpack: bool = False,
+    write_shards: bool = False,
+    write_ndjson: bool = False,
+) -> None:
+    # kept so workers can start their own workers with the same options
+    worker["init_args"] = {
+        "ggpk_path": ggpk_path,
+        "record_inputs": record_inputs,
+        "dat_cache_dir": dat_cache_dir,
+        "tables": tables,
+        "bundle_cache_dir": bundle_cache_dir,
+        "json_backend": json_backend,
+        "json_conformance": json_conformance,
+        "write_msgpack": write_msgpack,
+        "write_shards": write_shards,
+        "write_ndjson": write_ndjson,
+    }
+    json_writer.configure(json_backend, json_conformance)
+    msgpack_writer.configure(write_msgpack)
+    shards.configure(write_shards)
+    ndjson.configure(write_ndjson)
+    file_system = load_file_system(ggpk_path, bundle_cache_dir)
+    worker["file_system"] = file_system
+    if record_inputs:
+        recorder = InputRecorder(file_system)
+        worker["recorder"] = recorder
+        Parser_Module.cache_watchers.append(recorder.watch)
+    worker["relational_reader"] = create_relational_reader(file_system, dat_cache_dir, tables)
+    if record_inputs:
+        recorder.watch(worker["relational_reader"])
+
+
+def merge_tables(modules: List[type[Parser_Module]]) -> Optional[Dict[str, Optional[List[str]]]]:
+    """the tables and columns read by all given modules, None if any of them doesn't declare its tables"""
+    if any(module.tables is None for module in modules):
+        return None
+    tables: Dict[str, Optional[List[str]]] = {}
+    for module in modules:
+        for name, columns in module.tables.items():
+            if columns is None or (name in tables and tables[name] is None):
+                tables[name] = None
+            else:
+                tables[name] = sorted(set(tables.get(name) or []) | set(columns))
+    return tables
+
+
+def project_specification(specification: Specification, tables: Dict[str, Optional[List[str]]]) -> Specification:
+    """
+    Copies the specification without the foreign keys of columns that aren't read. The relational reader
+    then neither resolves those columns nor loads the tables they reference.
+    """
+    projected = copy.copy(specification)
+    for name, columns in tables.items():
+        key = name if name in specification else name.replace(".dat64", ".dat")
+        if columns is None or key not in specification:
+            continue
+        file_spec = copy.deepcopy(specification[key])
+        for field_name, field in file_spec.fields.items():
+            if field_name not in columns and field.key is not None:
+                field.key = None
+        projected[key] = file_spec
+    return projected
+
+
+def prefetch_tables(relational_reader: RelationalReader, tables: Dict[str, Optional[List[str]]]) -> None:
+    """loads the given tables in one pass and warns about declared columns they don't have"""
+    for name, columns in sorted(tables.items()):
+        table = relational_reader[name]
+        missing = [column for column in columns or [] if column not in table.table_columns]
+        if missing:
+            print(f"Warning: {name} has no columns {missing}")
+
+
+def create_relational_reader(
+    file_system: FileSystem,
+    dat_cache_dir: Optional[str] = None,
+    tables: Optional[Dict[str, Optional[List[str]]]] = None,
+) -> RelationalReader:
     opt = {
         "use_dat_value": False,
         "auto_build_index": True,
         "x64": True,
     }
-    return RelationalReader(
-        path_or_file_system=file_system, files=["Stats.dat64"], specification=generated.specification, read_options=opt
+    specification = (
+        generated.specification if tables is None else project_specification(generated.specification, tables)
     )
+    if dat_cache_dir is None:
+        return RelationalReader(
+            path_or_file_system=file_system,
+            files=["Stats.dat64"],
+            specification=specification,
+            read_options=opt,
+        )
+    relational_reader = RelationalReader(path_or_file_system=file_system, specification=specification, read_options=opt)
+    DatTableCache(dat_cache_dir, file_system, relational_reader, specification, tables)
+    relational_reader["Stats.dat64"]
+    return relational_reader
 
 
 DEFAULT_GGPK_PATH = "C:/Program Files (x86)/Grinding Gear Games/Path of Exile"
 
+DEFAULT_CACHE_DIR = os.path.join(__REPOE_DIR__, ".cache")
+
 
 def call_with_default_args(module: type[Parser_Module]):
     file_system = load_file_system(DEFAULT_GGPK_PATH)
-    return module(
-        file_system=file_system, data_path=__DATA_PATH__, relational_reader=create_relational_reader(file_system)
+    module(
+        file_system=file_system,
+        data_path=__DATA_PATH__,
+        relational_reader=create_relational_reader(file_system),
+        ggpk_path=DEFAULT_GGPK_PATH,
     ).write()
+    images.report_failures(export_images(images.queue.take(), __DATA_PATH__, file_system))
 
 
 def get_release_state(item_id: str) -> ReleaseState:
@@ -115,35 +274,39 @@ def get_stat_translation_file_name(game_file: str) -> Optional[str]:
         return None
 
 
-def export_image(ddsfile: str, data_path: str, file_system: FileSystem) -> None:
+def register_image(ddsfile: str) -> None:
+    """registers a DDS file to export as png and webp once all modules converted, see export_images"""
+    images.queue.register(ddsfile)
+
+
+def export_images(ddsfiles: List[str], data_path: str, file_system: FileSystem, jobs: int = 1) -> List[str]:
+    """exports each DDS file once, encoding them in up to jobs processes, returning the failures"""
+    with phase("images"):
+        images.pool.jobs = jobs
+        try:
+            for ddsfile in dict.fromkeys(ddsfiles):
+                _export_image(ddsfile, data_path, file_system)
+            return images.pool.wait()
+        finally:
+            images.pool.close()
+
+
+def _export_image(ddsfile: str, data_path: str, file_system: FileSystem) -> None:
     try:
         bytes = file_system.extract_dds(file_system.get_file(ddsfile))
-    except Exception:
-        print(f"Failed to extract {ddsfile}")
-        traceback.print_exc()
+    except Exception as e:
+        images.pool.fail(ddsfile, f"failed to extract: {type(e).__name__}: {e}")
         return
     if not bytes:
-        print(f"dds file not found {ddsfile}")
+        images.pool.fail(ddsfile, "dds file not found")
         return
     if bytes[:4] != b"DDS ":
-        print(f"{ddsfile} was not a dds file")
+        images.pool.fail(ddsfile, "not a dds file")
+        return
+    digest = md5(bytes).hexdigest()
+    manifest = images.pool.get_manifest(data_path)
+    if manifest.is_current(ddsfile, digest):
         return
     dest = os.path.join(data_path, os.path.splitext(ddsfile)[0])
     os.makedirs(os.path.dirname(dest), exist_ok=True)
-
-    # output images can vary slightly for the same input;
-    # hash the input data to avoid committing unnecessary changes
-    hashfile = dest + ".dds.md5sum"
-    exists = os.path.isfile(hashfile) and os.path.isfile(dest + ".png") and os.path.isfile(dest + ".webp")
-    with open(hashfile, "r+" if os.path.isfile(hashfile) else "w") as f:
-        hash = md5(bytes).hexdigest()
-        if exists and hash == f.read():
-            return
-        else:
-            f.seek(0)
-            f.write(hash)
-            f.truncate()
-
-    with Image.open(BytesIO(bytes)) as image:
-        image.save(dest + ".png")
-        image.save(dest + ".webp")
+    images.pool.submit(ddsfile, digest, bytes, dest)
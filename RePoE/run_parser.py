@@ -1,17 +1,264 @@
 import argparse
+import cProfile
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from graphlib import TopologicalSorter
+from typing import Any, Callable, Dict, List, Set
 
-import RePoE
-from RePoE import __DATA_PATH__
-from importlib import reload
+from RePoE import __DATA_PATH__, __REPOE_DIR__
 
+from RePoE.parser import Parser_Module
+from RePoE.parser import atlases, compression, images, json_writer, msgpack_writer, ndjson, output, profiling, shards
+from RePoE.parser.bundle_cache import prune
+from RePoE.parser.data_index import is_index_current, write_index
+from RePoE.parser.incremental import create_manifest, is_up_to_date, read_images, write_manifest
 from RePoE.parser.modules import get_parser_modules
 
 from RePoE.parser.util import (
-    create_relational_reader,
+    DEFAULT_CACHE_DIR,
     DEFAULT_GGPK_PATH,
+    create_relational_reader,
+    export_images,
+    init_worker,
     load_file_system,
+    merge_tables,
+    prefetch_tables,
+    worker,
 )
 
+PROFILE_SUMMARY_FILE = os.path.join(__REPOE_DIR__, "profile.json")
+PROFILE_STATS_DIR = os.path.join(__REPOE_DIR__, "profile", "")
+
+
+def _init_worker(args: argparse.Namespace) -> None:
+    dat_cache_dir = os.path.join(args.cache_dir, "dat") if args.dat_cache else None
+    bundle_cache_dir = os.path.join(args.cache_dir, "bundles") if args.bundle_cache else None
+    init_worker(
+        args.file,
+        args.incremental,
+        dat_cache_dir,
+        args.tables,
+        bundle_cache_dir,
+        args.json_backend,
+        args.json_conformance,
+        args.msgpack,
+        args.shards,
+        args.ndjson,
+    )
+    if args.profile:
+        relational_reader = worker["relational_reader"]
+        relational_reader.get_file = profiling.timed("load", relational_reader.get_file)
+        Parser_Module.cache_watchers.append(_time_cache)
+
+
+def _time_cache(cache) -> None:
+    cache.get_file = profiling.timed("load", cache.get_file)
+
+
+def _profile(name: str, function: Callable[[], None], args: argparse.Namespace) -> Dict[str, Any]:
+    """runs the function, returning the time spent in each phase and saving cProfile stats if requested"""
+    profiling.current = profiling.Profile()
+    stats = cProfile.Profile() if args.profile_stats else None
+    try:
+        with profiling.current.phase("convert"):
+            if stats is None:
+                function()
+            else:
+                stats.runcall(function)
+        summary = profiling.current.summary()
+    finally:
+        profiling.current = None
+    if stats is not None:
+        os.makedirs(PROFILE_STATS_DIR, exist_ok=True)
+        stats.dump_stats(os.path.join(PROFILE_STATS_DIR, name + ".pstats"))
+    return summary
+
+
+def _prefetch(modules: list[type[Parser_Module]], args: argparse.Namespace) -> Dict[str, Any]:
+    # modules without a declaration are only left out here, they read their tables when they run
+    tables = merge_tables([m for m in modules if m.tables is not None])
+    if args.profile:
+        return {"profile": _profile("prefetch", lambda: prefetch_tables(worker["relational_reader"], tables), args)}
+    prefetch_tables(worker["relational_reader"], tables)
+    return {}
+
+
+def _run_module(parser_module: type[Parser_Module], args: argparse.Namespace, jobs: int = 1) -> Dict[str, Any]:
+    if args.incremental and is_up_to_date(args.cache_dir, parser_module, __DATA_PATH__, worker["file_system"]):
+        print("Skipping module '%s', its inputs are unchanged" % parser_module.__name__)
+        # its images are still exported, the textures may have changed without the tables referencing them
+        return {"skipped": True, "images": read_images(args.cache_dir, parser_module)}
+
+    print("Running module '%s'" % parser_module.__name__)
+    result: Dict[str, Any] = {"skipped": False}
+    if args.jobs > 1 and parser_module.tables:
+        result["prefetch"] = _prefetch([parser_module], args)
+    module = parser_module(
+        file_system=worker["file_system"],
+        data_path=__DATA_PATH__,
+        relational_reader=worker["relational_reader"],
+        jobs=jobs,
+        ggpk_path=args.file,
+        cache_dir=args.cache_dir,
+        offline=args.offline,
+    )
+
+    def convert():
+        module.write()
+        result["images"] = images.queue.take()
+
+    if not args.incremental:
+        write = convert
+    else:
+        recorder = worker["recorder"]
+
+        def write():
+            with recorder.record() as paths:
+                convert()
+            manifest = create_manifest(parser_module, __DATA_PATH__, recorder.get_digests(paths), result["images"])
+            write_manifest(args.cache_dir, parser_module, manifest)
+
+    if args.profile:
+        result["profile"] = _profile(parser_module.__name__, write, args)
+    else:
+        write()
+    result["output"] = output.take_stats()
+    if args.check_projection and parser_module.tables:
+        result["projection_differences"] = _check_projection(parser_module, args)
+    return result
+
+
+def _check_projection(parser_module: type[Parser_Module], args: argparse.Namespace) -> List[str]:
+    """
+    Runs the module again with a relational reader that resolves all foreign keys and lists the files whose
+    compact version differs from the one written with the projected specification, i.e. where the module reads
+    columns its tables declaration is missing.
+    """
+    if "unprojected_relational_reader" not in worker:
+        worker["unprojected_relational_reader"] = create_relational_reader(worker["file_system"])
+    differences = []
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, "")
+        for name in parser_module.consumes:
+            shutil.copy(__DATA_PATH__ + name + ".min.json", data_path + name + ".min.json")
+        parser_module(
+            file_system=worker["file_system"],
+            data_path=data_path,
+            relational_reader=worker["unprojected_relational_reader"],
+            cache_dir=args.cache_dir,
+            offline=args.offline,
+        ).write()
+        images.queue.take()
+        output.take_stats()
+        consumed = {name + ".min.json" for name in parser_module.consumes}
+        for path, _, files in os.walk(directory):
+            for file in files:
+                name = os.path.relpath(os.path.join(path, file), directory)
+                if not name.endswith(".min.json") or name in consumed:
+                    continue
+                with open(os.path.join(directory, name), "rb") as f:
+                    expected = f.read()
+                projected = __DATA_PATH__ + name
+                if not os.path.isfile(projected):
+                    differences.append(f"{parser_module.__name__}: {name} was not written")
+                    continue
+                with open(projected, "rb") as f:
+                    if f.read() != expected:
+                        differences.append(f"{parser_module.__name__}: {name} differs")
+    return differences
+
+
+def _export_images(ddsfiles: List[str], args: argparse.Namespace) -> Dict[str, Any]:
+    """exports the images registered by all modules, each DDS file once"""
+    if "file_system" in worker:
+        file_system = worker["file_system"]
+    else:
+        file_system = load_file_system(
+            args.file, os.path.join(args.cache_dir, "bundles") if args.bundle_cache else None
+        )
+    result: Dict[str, Any] = {}
+
+    def export():
+        result["failures"] = export_images(ddsfiles, __DATA_PATH__, file_system, args.jobs)
+
+    if args.profile:
+        result["profile"] = _profile("images", export, args)
+    else:
+        export()
+    result["output"] = output.take_stats()
+    return result
+
+
+def get_dependencies(modules: list[type[Parser_Module]]) -> Dict[str, Set[str]]:
+    """maps each module name to the names of the given modules that produce files it consumes"""
+    producers = {output: module.__name__ for module in modules for output in module.produces}
+    return {module.__name__: {producers[name] for name in module.consumes if name in producers} for module in modules}
+
+
+def run_serial(modules: list[type[Parser_Module]], args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    print("Loading GGPK ...", end="", flush=True)
+    _init_worker(args)
+    print(" Done!")
+
+    print("Loading tables ...", end="", flush=True)
+    results = {"prefetch": _prefetch(modules, args)}
+    print(" Done!")
+
+    sorter = TopologicalSorter(get_dependencies(modules))
+    sorter.prepare()
+    while sorter.is_active():
+        for name in sorted(sorter.get_ready()):
+            results[name] = _run_module(next(m for m in modules if m.__name__ == name), args, args.jobs)
+            sorter.done(name)
+    return results
+
+
+def run_parallel(modules: list[type[Parser_Module]], args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    sorter = TopologicalSorter(get_dependencies(modules))
+    sorter.prepare()
+    # modules that start their own workers, i.e. stat_translations, get half of the processes, so both pools
+    # together keep at most --jobs processes busy
+    module_jobs = args.jobs // 2 if args.jobs >= 4 else 1
+    max_workers = args.jobs - module_jobs if module_jobs > 1 else args.jobs
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(args,)) as executor:
+        running: Dict[Future, str] = {}
+        while sorter.is_active():
+            for name in sorted(sorter.get_ready()):
+                parser_module = next(m for m in modules if m.__name__ == name)
+                running[executor.submit(_run_module, parser_module, args, module_jobs)] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception:
+                    print("Error running module '%s'" % name)
+                    for pending in running:
+                        pending.cancel()
+                    raise
+                sorter.done(name)
+    return results
+
+
+def write_profile(results: Dict[str, Dict[str, Any]], wall: float, args: argparse.Namespace) -> None:
+    with open(os.path.join(__REPOE_DIR__, "version.txt")) as f:
+        version = f.read().strip()
+    summary = {
+        "version": version,
+        "jobs": args.jobs,
+        "wall": round(wall, 3),
+        "modules": {name: result for name, result in results.items() if "profile" in result},
+    }
+    with open(PROFILE_SUMMARY_FILE, "w") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+    print("Wrote profile summary to", PROFILE_SUMMARY_FILE)
+
 
 def main():
     modules = get_parser_modules()
@@ -28,30 +275,162 @@ def main():
         help="the converter modules to run (choose from '" + "', '".join(module_names) + "')",
     )
     parser.add_argument("-f", "--file", default=DEFAULT_GGPK_PATH, help="path to your Content.ggpk file")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes to run modules and their sub tasks in (default: 1)",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="skip modules whose game files, data files and code are unchanged since they last ran",
+    )
+    parser.add_argument(
+        "--cache-dir", default=DEFAULT_CACHE_DIR, help="directory for files kept between runs (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--dat-cache",
+        action="store_true",
+        help="keep decoded .dat64 tables in the cache directory and reuse them while their files are unchanged",
+    )
+    parser.add_argument(
+        "--bundle-cache",
+        action="store_true",
+        help="keep index and bundle files fetched from a patch server in the cache directory, so later runs only "
+        + "download bundles that changed and work offline once every file was fetched",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="use the snapshots in the cache directory for data otherwise downloaded while converting, "
+        + "e.g. the trade stats",
+    )
+    parser.add_argument(
+        "--json-backend",
+        choices=json_writer.BACKENDS,
+        default="python",
+        help="encoder for the json files, orjson needs the orjson package and writes the same bytes "
+        + "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--json-conformance",
+        action="store_true",
+        help="also encode each file with the python backend and report where the output of --json-backend differs",
+    )
+    parser.add_argument(
+        "--msgpack",
+        action="store_true",
+        help="also write each object as MessagePack, e.g. stats.msgpack, without the null values like the .min.json "
+        + "files, needs the msgpack package",
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="also write mods split by domain and generation type, gems split by granted effect and base items split "
+        + "by item class, each with an index of the shard of each id, e.g. mods/index.json",
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="also write mods, base_items, flavour and gems_minimal as json lines while converting them, "
+        + "one [id, value] pair per line, e.g. mods.ndjson",
+    )
+    parser.add_argument(
+        "--compress",
+        action="append",
+        choices=compression.FORMATS,
+        default=[],
+        help="write a compressed copy of each .min.json file, e.g. stats.min.json.gz, skipping files unchanged since "
+        + "the last run, br needs the brotli package and zst the zstandard package (can be repeated)",
+    )
+    parser.add_argument(
+        "--atlases",
+        action="store_true",
+        help="also pack the exported icons of each directory into sprite atlases, indexed by DDS file in "
+        + "Art/atlases.json, only rebuilding atlases whose icons changed",
+    )
+    parser.add_argument(
+        "--check-projection",
+        action="store_true",
+        help="run each module that declares its tables again with all foreign keys resolved and fail if its "
+        + "output differs, i.e. if the declaration is missing columns the module reads",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="record the wall and CPU time of each module and write a summary to " + PROFILE_SUMMARY_FILE,
+    )
+    parser.add_argument(
+        "--profile-stats",
+        action="store_true",
+        help="with --profile, also save cProfile stats of each module to " + PROFILE_STATS_DIR,
+    )
     args = parser.parse_args()
-
-    print("Loading GGPK ...", end="", flush=True)
-    file_system = load_file_system(args.file)
-    print(" Done!")
+    try:
+        json_writer.configure(args.json_backend, args.json_conformance)
+        msgpack_writer.configure(args.msgpack)
+        shards.configure(args.shards)
+        ndjson.configure(args.ndjson)
+        compression.check_formats(args.compress)
+    except ValueError as e:
+        parser.error(str(e))
 
     selected_module_names = args.module_names
     if "all" in selected_module_names:
         selected_module_names = [m for m in module_names if m != "all"]
+    selected_modules = [m for m in modules if m.__name__ in selected_module_names]
+    # only resolve the foreign keys the selected modules use, if all of them declare the tables they read
+    args.tables = merge_tables(selected_modules)
 
-    rr = create_relational_reader(file_system)
-
-    for name in selected_module_names:
-        parser_module = next(m for m in modules if m.__name__ == name)
-        print("Running module '%s'" % parser_module.__name__)
-        parser_module(
-            file_system=file_system,
-            data_path=__DATA_PATH__,
-            relational_reader=rr,
-        ).write()
+    if args.bundle_cache:
+        prune(os.path.join(args.cache_dir, "bundles"))
 
-    # This forces the globals to be up to date with what we just parsed,
-    # in case someone uses `run_parser` within a script
-    reload(RePoE)
+    start = time.perf_counter()
+    if args.jobs > 1:
+        results = run_parallel(selected_modules, args)
+    else:
+        results = run_serial(selected_modules, args)
+    ddsfiles = sorted({ddsfile for result in results.values() for ddsfile in result.get("images", [])})
+    if ddsfiles:
+        print(f"Exporting {len(ddsfiles)} images ...", end="", flush=True)
+        results["image_export"] = _export_images(ddsfiles, args)
+        print(" Done!")
+    if args.profile:
+        write_profile(results, time.perf_counter() - start, args)
+    images.report_failures(results.get("image_export", {}).get("failures", []))
+    differences = [d for result in results.values() for d in result.get("projection_differences", [])]
+    if differences:
+        print(
+            "The output of these modules changes when all foreign keys are resolved, add the columns they read to "
+            + "their tables:"
+        )
+        for difference in differences:
+            print("  " + difference)
+    if args.atlases:
+        print("Packing atlases ...", end="", flush=True)
+        count = atlases.build_atlases(__DATA_PATH__)
+        print(f" Done! Rebuilt the atlases of {count} directories")
+    if args.compress:
+        print("Compressing files ...", end="", flush=True)
+        count = compression.compress_outputs(__DATA_PATH__, args.compress, args.jobs)
+        print(f" Done! Wrote {count} compressed files")
+    written = {"changed": 0, "unchanged": 0}
+    # the atlases and compressed copies were written by this process after the modules
+    for stats in [result.get("output", {}) for result in results.values()] + [output.take_stats()]:
+        for key, count in stats.items():
+            written[key] += count
+    with open(os.path.join(__REPOE_DIR__, "version.txt")) as f:
+        version = f.read().strip()
+    if written["changed"] or not is_index_current(__DATA_PATH__, version):
+        write_index(__DATA_PATH__, version)
+        for key, count in output.take_stats().items():
+            written[key] += count
+    print("Wrote {changed} changed files, {unchanged} files were unchanged".format(**written))
+    if differences:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+# renders stats as the text shown in game from stat_translations and stat_value_handlers, see
+# docs/stat_translations.md for the rules
+import math
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import RePoE
+
+Value = Union[int, float, Tuple[float, float]]
+
+_PLACEHOLDER = re.compile(r"\{(\d+)\}")
+# numbers without a precision are shown with at most this many decimal places
+DEFAULT_PRECISION = 2
+
+
+def _number(precision: Optional[int], fixed: bool) -> Callable[[Any], str]:
+    """
+    Formats handled values, without trailing zeros unless fixed.
+
+    >>> _number(0, False)(20.4), _number(0, False)(100.2), _number(1, False)(2.5), _number(2, True)(1.5)
+    ('20', '100', '2.5', '1.50')
+    """
+    if precision is None:
+        precision = DEFAULT_PRECISION
+    elif fixed:
+        return lambda value: f"{value:.{precision}f}"
+
+    def number(value: Any) -> str:
+        if isinstance(value, str):
+            return value
+        if value == int(value):
+            return str(int(value))
+        text = f"{value:.{precision}f}"
+        return text.rstrip("0").rstrip(".") if "." in text else text
+
+    return number
+
+
+def _handler(spec: Optional[Dict[str, Any]]) -> Tuple[Optional[Callable[[Any], Any]], Optional[int], bool]:
+    """the function of a value handler with the precision and fixedness it formats its result with"""
+    if spec is None or spec["type"] == "string":
+        return None, None, False
+    if "values" in spec:
+        values = spec["values"]
+        return (lambda value: values.get(str(int(value)), value)), None, False
+    multiplier = spec.get("multiplier", 1)
+    divisor = spec.get("divisor", 1)
+    addend = spec.get("addend", 0)
+    if (multiplier, divisor, addend) == (1, 1, 0):
+        function = None
+    elif divisor == 1:
+        function = lambda value: value * multiplier + addend  # noqa: E731
+    else:
+        function = lambda value: value * multiplier / divisor + addend  # noqa: E731
+    return function, spec.get("precision"), spec.get("fixed", False)
+
+
+def _chain(functions: List[Callable[[Any], Any]]) -> Optional[Callable[[Any], Any]]:
+    if not functions:
+        return None
+    if len(functions) == 1:
+        return functions[0]
+
+    def chain(value: Any) -> Any:
+        for function in functions:
+            value = function(value)
+        return value
+
+    return chain
+
+
+class _Line:
+    """one string of a translation, with its conditions and a formatter for each value"""
+
+    def __init__(self, line: Dict[str, Any], handlers: Dict[str, Dict[str, Any]]) -> None:
+        self.conditions = [
+            (c.get("min", -math.inf), c.get("max", math.inf), c.get("negated", False)) for c in line["condition"]
+        ]
+        self.handlers: List[Optional[Callable[[Any], Any]]] = []
+        self.formatters: List[Callable[[Any], str]] = []
+        for names in line["index_handlers"]:
+            functions = []
+            precision, fixed = None, False
+            for name in names:
+                function, handler_precision, handler_fixed = _handler(handlers.get(name))
+                if function is not None:
+                    functions.append(function)
+                if handler_precision is not None:
+                    precision, fixed = handler_precision, handler_fixed
+            self.handlers.append(_chain(functions))
+            self.formatters.append(_number(precision, fixed))
+        self.formats = line["format"]
+        # the literal text between the placeholders, and the index of the value of each placeholder
+        parts = _PLACEHOLDER.split(line["string"])
+        self.texts = parts[::2]
+        self.indexes = [int(i) for i in parts[1::2]]
+
+    def matches(self, values: List[Value], both: bool) -> bool:
+        for (low, high, negated), value in zip(self.conditions, values):
+            if isinstance(value, tuple):
+                ends = [low <= v <= high for v in value]
+                matched = all(ends) if both else any(ends)
+            else:
+                matched = low <= value <= high
+            if matched == negated:
+                return False
+        return True
+
+    def _format(self, i: int, value: Any) -> str:
+        formatter = self.formatters[i]
+        if isinstance(value, tuple):
+            low, high = value
+            if not isinstance(low, str) and not isinstance(high, str) and low < 0 and high < 0:
+                text = f"-({formatter(-low)} to {formatter(-high)})"
+            else:
+                text = f"({formatter(low)} to {formatter(high)})"
+            positive = all(not isinstance(v, str) and v > 0 for v in value)
+        else:
+            text = formatter(value)
+            positive = not isinstance(value, str) and value > 0
+        return "+" + text if positive and self.formats[i] == "+#" else text
+
+    def handle(self, columns: List[List[Value]]) -> List[List[Value]]:
+        """applies the handlers of each value to the values at its index of many stats at once"""
+        handled = []
+        for handler, column in zip(self.handlers, columns):
+            if handler is None:
+                handled.append(column)
+            else:
+                handled.append([(handler(v[0]), handler(v[1])) if isinstance(v, tuple) else handler(v) for v in column])
+        return handled
+
+    def render(self, values: List[Value]) -> str:
+        texts = self.texts
+        parts = [texts[0]]
+        for index, text in zip(self.indexes, texts[1:]):
+            parts.append(self._format(index, values[index]))
+            parts.append(text)
+        return "".join(parts)
+
+
+class _Translation:
+    def __init__(self, translation: Dict[str, Any], handlers: Dict[str, Dict[str, Any]]) -> None:
+        self.ids: List[str] = translation["ids"]
+        self.hidden = translation.get("hidden", False)
+        self.lines = [_Line(line, handlers) for line in translation["English"]]
+
+    def find(self, values: List[Value]) -> Optional[_Line]:
+        for both in [True, False] if any(isinstance(v, tuple) for v in values) else [True]:
+            for line in self.lines:
+                if line.matches(values, both):
+                    return line
+        return None
+
+
+def _is_zero(value: Value) -> bool:
+    return value == (0, 0) if isinstance(value, tuple) else value == 0
+
+
+class Translator:
+    """
+    Renders stats with the translations of one stat translation file, e.g. Translator("monster"). Each stat is
+    translated by the first translation with its id, values of other stats of that translation default to 0.
+    """
+
+    def __init__(self, name: str = RePoE.MAIN_STAT_TRANSLATIONS, include_hidden: bool = False) -> None:
+        handlers = RePoE.stat_value_handlers
+        self.by_id: Dict[str, _Translation] = {}
+        for translation in RePoE.stat_translations[name]:
+            compiled = _Translation(translation, handlers)
+            if compiled.hidden and not include_hidden:
+                continue
+            for stat_id in compiled.ids:
+                self.by_id.setdefault(stat_id, compiled)
+
+    def _match(self, stats: Dict[str, Value]) -> List[Tuple[_Line, List[Value]]]:
+        """the line and values of each translation of the stats, in the order of their first stat"""
+        matched = []
+        seen = set()
+        for stat_id in stats:
+            translation = self.by_id.get(stat_id)
+            if translation is None or id(translation) in seen:
+                continue
+            seen.add(id(translation))
+            values = [stats.get(i, 0) for i in translation.ids]
+            if all(_is_zero(v) for v in values):
+                continue
+            line = translation.find(values)
+            if line is not None:
+                matched.append((line, values))
+        return matched
+
+    def translate(self, stats: Dict[str, Value]) -> List[str]:
+        """the lines of text of the stats, values can be numbers or (min, max) ranges"""
+        return self.translate_batch([stats])[0]
+
+    def translate_batch(self, items: Iterable[Dict[str, Value]]) -> List[List[str]]:
+        """
+        The lines of text of the stats of each item. The values of all items that use the same translation
+        string are handled together, one value index at a time.
+        """
+        matched = [self._match(stats) for stats in items]
+        groups: Dict[int, Tuple[_Line, List[List[Value]]]] = {}
+        for item in matched:
+            for line, values in item:
+                groups.setdefault(id(line), (line, []))[1].append(values)
+        rendered: Dict[int, Iterable[str]] = {}
+        for key, (line, rows) in groups.items():
+            columns = line.handle([list(column) for column in zip(*rows)])
+            rendered[key] = iter([line.render(list(values)) for values in zip(*columns)])
+        return [[text for line, _ in item for text in next(rendered[id(line)]).split("\n")] for item in matched]
+
+
+# translators by file name, with the data they were compiled from
+_translators: Dict[Tuple[str, bool], Tuple[Any, Any, Translator]] = {}
+
+
+def get_translator(name: str = RePoE.MAIN_STAT_TRANSLATIONS, include_hidden: bool = False) -> Translator:
+    """a translator of the file, compiled once and again when the file or the value handlers changed"""
+    translations = RePoE.stat_translations[name]
+    handlers = RePoE.stat_value_handlers
+    cached = _translators.get((name, include_hidden))
+    if cached is None or cached[0] is not translations or cached[1] is not handlers:
+        cached = (translations, handlers, Translator(name, include_hidden))
+        _translators[(name, include_hidden)] = cached
+    return cached[2]
+
+
+def translate(stats: Dict[str, Value], name: str = RePoE.MAIN_STAT_TRANSLATIONS) -> List[str]:
+    return get_translator(name).translate(stats)
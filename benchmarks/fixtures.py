@@ -0,0 +1,277 @@
+import json
+import random
+import struct
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from PyPoE.poe.file.file_system import FileSystem
+from PyPoE.poe.file.specification.data import generated
+from PyPoE.poe.file.specification.fields import Field, File
+
+from RePoE.parser.modules.base_items import ITEM_CLASS_WHITELIST
+
+# rows of the tables the converters spend most of their time on, at scale 1
+ROW_COUNTS = {
+    "Mods": 30000,
+    "Stats": 20000,
+    "BaseItemTypes": 4000,
+    "ItemVisualIdentity": 4000,
+    "SkillGems": 700,
+    "GrantedEffects": 1400,
+    "GrantedEffectsPerLevel": 700 * 40,
+    "GrantedEffectStatSets": 1400,
+    "GrantedEffectStatSetsPerLevel": 700 * 40,
+    "ActiveSkills": 700,
+    "Tags": 1000,
+    "FlavourText": 3000,
+    "CraftingBenchOptions": 1500,
+    "Essences": 100,
+    "DefaultMonsterStats": 100,
+    "ArmourTypes": 1000,
+    "WeaponTypes": 500,
+    "ComponentAttributeRequirements": 3000,
+}
+# rows of every other table
+DEFAULT_ROW_COUNT = 20
+
+# stat description files generated, with the number of descriptions in each at scale 1
+STAT_DESCRIPTION_FILES = {
+    "stat_descriptions.txt": 15000,
+    "active_skill_gem_stat_descriptions.txt": 3000,
+    "gem_stat_descriptions.txt": 2000,
+    "map_stat_descriptions.txt": 500,
+    "monster_stat_descriptions.txt": 2000,
+    "passive_skill_stat_descriptions.txt": 1500,
+}
+
+ART_FILE = "Art/2DItems/Synthetic/Item{}.dds"
+
+# struct formats of the fixed size column types
+_PRIMITIVES = {
+    "bool": "?",
+    "byte": "b",
+    "ubyte": "B",
+    "short": "h",
+    "ushort": "H",
+    "int": "i",
+    "uint": "I",
+    "long": "q",
+    "ulong": "Q",
+    "float": "f",
+    "double": "d",
+}
+
+
+def _table_name(file_name: str) -> str:
+    return file_name.split(".")[0]
+
+
+def _dds(width: int = 4, height: int = 4) -> bytes:
+    """an uncompressed 32 bit RGBA .dds image"""
+    header = struct.pack(
+        "<4s7I44x8I5I",
+        b"DDS ",
+        124,
+        0x100F,
+        height,
+        width,
+        width * 4,
+        0,
+        0,
+        32,
+        0x41,
+        0,
+        32,
+        0xFF0000,
+        0xFF00,
+        0xFF,
+        0xFF000000,
+        0x1000,
+        0,
+        0,
+        0,
+        0,
+    )
+    return header + bytes(range(256))[: width * height * 4].ljust(width * height * 4, b"\x7f")
+
+
+class _DataSection:
+    """the variable length data of a .dat64 file, values are referenced by their offset"""
+
+    MAGIC = b"\xbb" * 8
+
+    def __init__(self) -> None:
+        self.data = bytearray(self.MAGIC)
+        self.strings: Dict[str, int] = {}
+
+    def add(self, data: bytes) -> int:
+        offset = len(self.data)
+        self.data += data
+        return offset
+
+    def add_string(self, value: str) -> int:
+        if value not in self.strings:
+            self.strings[value] = self.add(value.encode("utf-16-le") + b"\0\0\0\0")
+        return self.strings[value]
+
+
+class DatFixture:
+    """writes .dat64 files with generated rows for all tables of a specification"""
+
+    def __init__(self, scale: float = 1.0, seed: int = 0, specification=generated.specification) -> None:
+        self.specification = specification
+        self.random = random.Random(seed)
+        self.row_counts = {
+            _table_name(file_name): max(1, round(ROW_COUNTS.get(_table_name(file_name), DEFAULT_ROW_COUNT) * scale))
+            for file_name in specification
+        }
+        self.row_counts["ItemClasses"] = len(ITEM_CLASS_WHITELIST)
+        # values of columns that converters look up or validate, by table and column name
+        self.overrides: Dict[Tuple[str, str], Callable[[int], Any]] = {
+            ("ItemClasses", "Id"): lambda row: sorted(ITEM_CLASS_WHITELIST)[row],
+            ("BaseItemTypes", "InheritsFrom"): lambda row: "Metadata/Items/Item",
+            ("ItemVisualIdentity", "DDSFile"): ART_FILE.format,
+            ("Stats", "Id"): self.stat_id,
+        }
+
+    def stat_id(self, row: int) -> str:
+        return f"synthetic_stat_{row}"
+
+    def _value(self, table: str, name: str, field: Field, field_type: str, row: int) -> Any:
+        if (table, name) in self.overrides:
+            return self.overrides[(table, name)](row)
+        if field.key is not None:
+            return self.random.randrange(self.row_counts.get(_table_name(field.key), 1))
+        if field_type == "ref|string":
+            return f"{table}{name}{row}" if name.endswith("Id") else f"{name} {self.random.randrange(100)}"
+        if field_type == "bool":
+            return self.random.random() < 0.5
+        if field_type in ("float", "double"):
+            return round(self.random.uniform(0, 100), 2)
+        if getattr(field, "enum", None):
+            return 1
+        return self.random.randrange(1, 100)
+
+    def _encode(self, field: Field, field_type: str, value: Any, data: _DataSection) -> bytes:
+        if field_type in _PRIMITIVES:
+            return struct.pack("<" + _PRIMITIVES[field_type], value)
+        if field_type == "ref|string":
+            return struct.pack("<Q", data.add_string(value))
+        if field_type == "ref|generic":
+            # foreign rows are stored as the row index followed by an unused key
+            return struct.pack("<QQ", value, 0)
+        if field_type.startswith("ref|list|"):
+            element_type = field_type[len("ref|list|") :]
+            elements = b"".join(self._encode(field, element_type, v, data) for v in value)
+            return struct.pack("<QQ", len(value), data.add(elements) if value else 0)
+        if field_type.startswith("ref|"):
+            return struct.pack("<Q", data.add(self._encode(field, field_type[len("ref|") :], value, data)))
+        raise ValueError(f"Unsupported column type {field_type}, add it to benchmarks/fixtures.py")
+
+    def _row_value(self, table: str, name: str, field: Field, row: int) -> Any:
+        if field.type.startswith("ref|list|"):
+            element_type = field.type[len("ref|list|") :]
+            count = self.random.randrange(4)
+            return [self._value(table, name, field, element_type, row) for _ in range(count)]
+        if field.type.startswith("ref|") and field.type not in ("ref|string", "ref|generic"):
+            return self._value(table, name, field, field.type[len("ref|") :], row)
+        return self._value(table, name, field, field.type, row)
+
+    def table(self, file_name: str, file_spec: File) -> bytes:
+        table = _table_name(file_name)
+        fields = [(name, field) for name, field in file_spec.fields.items() if not getattr(field, "virtual", False)]
+        data = _DataSection()
+        rows = bytearray()
+        for row in range(self.row_counts[table]):
+            for name, field in fields:
+                rows += self._encode(field, field.type, self._row_value(table, name, field, row), data)
+        return struct.pack("<I", self.row_counts[table]) + bytes(rows) + bytes(data.data)
+
+    def tables(self) -> Iterable[Tuple[str, bytes]]:
+        for file_name, file_spec in self.specification.items():
+            yield "Data/" + _table_name(file_name) + ".dat64", self.table(file_name, file_spec)
+
+    def stat_descriptions(self, scale: float = 1.0) -> Iterable[Tuple[str, bytes]]:
+        stat_count = self.row_counts.get("Stats", 1)
+        for file_name, count in STAT_DESCRIPTION_FILES.items():
+            lines = []
+            for i in range(max(1, round(count * scale))):
+                stat = self.stat_id(self.random.randrange(stat_count))
+                lines += [
+                    "description",
+                    f"\t1 {stat}",
+                    "\t2",
+                    f'\t\t1|# "{{0:+d}} to synthetic stat {i}"',
+                    f'\t\t#|-1 "{{0}} reduced synthetic stat {i}" negate 1',
+                    "",
+                ]
+            yield "Metadata/StatDescriptions/" + file_name, "\r\n".join(lines).encode("utf-16")
+        yield "Metadata/StatDescriptions/skillpopup_stat_filters.txt", "".encode("utf-16")
+
+    def trade_stats(self, scale: float = 1.0) -> bytes:
+        """a response of the trade stats api with an entry for each text of stat_descriptions.txt"""
+        count = max(1, round(STAT_DESCRIPTION_FILES["stat_descriptions.txt"] * scale))
+        entries = [
+            {"id": f"explicit.stat_{i}", "text": f"+# to synthetic stat {i}", "type": "explicit"} for i in range(count)
+        ]
+        return json.dumps({"result": [{"id": "explicit", "label": "Explicit", "entries": entries}]}).encode()
+
+    def files(self, scale: float = 1.0) -> Dict[str, bytes]:
+        files = dict(self.tables())
+        files.update(self.stat_descriptions(scale))
+        files[
+            "Metadata/Items/Item.it"
+        ] = 'version 2\r\nextends "nothing"\r\n\r\nBase\r\n{\r\n\ttag = "default"\r\n}\r\n'.encode("utf-16")
+        image = _dds()
+        for row in range(self.row_counts.get("ItemVisualIdentity", 0)):
+            files[ART_FILE.format(row)] = image
+        return files
+
+
+class _Node:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.children: Dict[str, "_Node"] = {}
+
+    def __getitem__(self, name: str) -> "_Node":
+        return self.children[name]
+
+
+class MemoryFileSystem(FileSystem):
+    """serves game files from memory instead of a GGPK or bundle index"""
+
+    def __init__(self, files: Dict[str, bytes]) -> None:
+        self.files = files
+        self._lower = {path.lower(): path for path in files}
+
+    def get_file(self, path: str, *args, **kwargs) -> bytes:
+        path = path.replace("\\", "/")
+        if path in self.files:
+            return self.files[path]
+        if path.lower() in self._lower:
+            return self.files[self._lower[path.lower()]]
+        # tables may be requested without their directory
+        data_path = "data/" + path.lower()
+        if data_path in self._lower:
+            return self.files[self._lower[data_path]]
+        raise FileNotFoundError(path)
+
+    def build_directory(self, *args, **kwargs) -> _Node:
+        root = _Node("")
+        for path in self.files:
+            node = root
+            for part in path.split("/"):
+                node = node.children.setdefault(part, _Node(part))
+        return root
+
+    def extract_dds(self, data: bytes, *args, **kwargs) -> bytes:
+        return data
+
+
+def row_count(files: Dict[str, bytes], tables: Optional[List[str]]) -> int:
+    """the total number of rows of the given tables"""
+    total = 0
+    for name in tables or []:
+        data = files.get("Data/" + _table_name(name) + ".dat64")
+        if data is not None:
+            total += struct.unpack_from("<I", data)[0]
+    return total
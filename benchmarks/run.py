@@ -0,0 +1,198 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from graphlib import TopologicalSorter
+from typing import Any, Dict, List, Optional
+
+from RePoE.parser import images, profiling
+from RePoE.parser.modules import get_parser_modules
+from RePoE.parser.modules.stat_translations import TRADE_STATS_URL
+from RePoE.parser.snapshots import save_snapshot
+from RePoE.parser.util import create_relational_reader, export_images, merge_tables
+from RePoE.run_parser import get_dependencies
+
+from benchmarks.fixtures import DatFixture, MemoryFileSystem, row_count
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+# modules that download data while they run, their timings would measure the network
+NETWORK_MODULES = ["mods_by_base", "uniques"]
+
+# tables counted for the throughput of modules that don't declare the tables they read
+PRIMARY_TABLES = {
+    "mods": ["Mods.dat64"],
+    "gems": ["SkillGems.dat64", "GrantedEffectsPerLevel.dat64", "GrantedEffectStatSetsPerLevel.dat64"],
+    "stat_translations": ["Stats.dat64"],
+}
+
+
+def _peak_rss() -> int:
+    """peak resident set size of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _bench_module(
+    name: str, fixture_file: str, data_path: str, cache_dir: str, dat_cache_dir: Optional[str]
+) -> Dict[str, Any]:
+    """runs a single module in a fresh process against the synthetic game files"""
+    with open(fixture_file, "rb") as f:
+        files = pickle.load(f)
+    parser_module = next(m for m in get_parser_modules() if m.__name__ == name)
+    tables = merge_tables([parser_module])
+    baseline_rss = _peak_rss()
+
+    profiling.current = profiling.Profile()
+    start = time.perf_counter()
+    with profiling.current.phase("convert"):
+        file_system = MemoryFileSystem(files)
+        with profiling.phase("load"):
+            relational_reader = create_relational_reader(file_system, dat_cache_dir, tables)
+        relational_reader.get_file = profiling.timed("load", relational_reader.get_file)
+        parser_module(
+            file_system=file_system,
+            data_path=data_path,
+            relational_reader=relational_reader,
+            cache_dir=cache_dir,
+            offline=True,
+        ).write()
+        image_failures = export_images(images.queue.take(), data_path, file_system)
+    seconds = time.perf_counter() - start
+
+    rows = row_count(files, list(parser_module.tables or PRIMARY_TABLES.get(name, [])))
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+        "peak_rss_mb": round(_peak_rss() / 2**20, 1),
+        "baseline_rss_mb": round(baseline_rss / 2**20, 1),
+        "phases": profiling.current.summary()["phases"],
+        "image_failures": len(image_failures),
+    }
+
+
+def _run_isolated(name: str, *args) -> Dict[str, Any]:
+    # a new interpreter for each module, so its peak RSS isn't inflated by the modules before it
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_bench_module, name, *args).result()
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _module_order(names: List[str]) -> List[str]:
+    modules = [m for m in get_parser_modules() if m.__name__ in names]
+    dependencies = get_dependencies(modules)
+    return list(TopologicalSorter({name: dependencies[name] for name in sorted(dependencies)}).static_order())
+
+
+def run(names: List[str], args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "dat_cache": args.dat_cache,
+        "modules": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="repoe-benchmark-") as tmp:
+        print("Generating fixtures ...", end="", flush=True)
+        start = time.perf_counter()
+        fixture = DatFixture(args.scale, args.seed)
+        files = fixture.files(args.scale)
+        cache_dir = os.path.join(tmp, "cache")
+        # modules run offline, with snapshots of synthetic data for what they would download
+        save_snapshot("trade_stats", TRADE_STATS_URL, cache_dir, fixture.trade_stats(args.scale))
+        fixture_file = os.path.join(tmp, "fixtures.pickle")
+        with open(fixture_file, "wb") as f:
+            pickle.dump(files, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f" Done! {len(files)} files in {time.perf_counter() - start:.1f}s")
+
+        data_path = os.path.join(tmp, "data", "")
+        os.makedirs(data_path)
+        dat_cache_dir = os.path.join(cache_dir, "dat") if args.dat_cache else None
+        for name in _module_order(names):
+            print(f"Benchmarking module '{name}' ...", end="", flush=True)
+            try:
+                result = _run_isolated(name, fixture_file, data_path, cache_dir, dat_cache_dir)
+            except Exception as e:
+                traceback.print_exception(e)
+                result = {"error": f"{type(e).__name__}: {e}"}
+                print(f" Failed: {result['error']}")
+            else:
+                print(f" {result['rows_per_second']} rows/s, {result['peak_rss_mb']} MB peak RSS")
+            results["modules"][name] = result
+    return results
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    if (old.get("scale"), old.get("seed")) != (new.get("scale"), new.get("seed")):
+        print("Warning: the results were measured with different fixtures")
+    print(f"{'module':<24}{'rows/s':>24}{'peak RSS MB':>24}")
+    for name, result in sorted(new["modules"].items()):
+        before = old["modules"].get(name, {})
+        columns = []
+        for key in ["rows_per_second", "peak_rss_mb"]:
+            if key not in result or key not in before or not before[key]:
+                columns.append(str(result.get(key, "-")))
+            else:
+                columns.append(f"{before[key]} -> {result[key]} ({result[key] / before[key] - 1:+.1%})")
+        print(f"{name:<24}{columns[0]:>24}{columns[1]:>24}")
+
+
+def main():
+    module_names = sorted(m.__name__ for m in get_parser_modules())
+    parser = argparse.ArgumentParser(description="Benchmark the converter modules against synthetic game files")
+    parser.add_argument(
+        "module_names",
+        metavar="module",
+        nargs="*",
+        help="the modules to benchmark (default: all except " + ", ".join(NETWORK_MODULES) + ")",
+    )
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the number of generated rows")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated values")
+    parser.add_argument("--dat-cache", action="store_true", help="load tables through the decoded table cache")
+    parser.add_argument("-o", "--output", help="file to write the results to (default: results/<commit>.json)")
+    parser.add_argument("--compare", metavar="FILE", help="results of an earlier run to compare against")
+    args = parser.parse_args()
+    unknown = set(args.module_names) - set(module_names)
+    if unknown:
+        parser.error(
+            "unknown modules: " + ", ".join(sorted(unknown)) + " (choose from " + ", ".join(module_names) + ")"
+        )
+
+    names = args.module_names or [name for name in module_names if name not in NETWORK_MODULES]
+    results = run(names, args)
+
+    output = args.output or os.path.join(RESULTS_DIR, (results["commit"] or "results") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print("Wrote results to", output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import json
+import os
+from hashlib import md5
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("PyPoE")
+
+from PIL import Image  # noqa: E402
+
+from benchmarks.fixtures import MemoryFileSystem  # noqa: E402
+from RePoE.parser import atlases, images  # noqa: E402
+from RePoE.parser.util import export_images, register_image  # noqa: E402
+
+ICON = "Art/2DItems/Currency/Orb.dds"
+OTHER_ICON = "Art/2DItems/Currency/Shard.dds"
+STALE = b"not re-encoded"
+
+
+def _dds(color) -> bytes:
+    out = BytesIO()
+    Image.new("RGBA", (4, 4), color).save(out, format="DDS")
+    return out.getvalue()
+
+
+def _export(data_path, files, ddsfiles=None):
+    """exports like a new run of the parser, with a pool that reads the manifest again"""
+    images.pool = images.ImagePool()
+    return export_images(ddsfiles or sorted(files), str(data_path), MemoryFileSystem(files))
+
+
+def _read(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch):
+    monkeypatch.setattr(images, "pool", images.ImagePool())
+
+
+def test_exports_png_and_webp(tmp_path):
+    assert _export(tmp_path, {ICON: _dds((255, 0, 0, 255))}) == []
+    for image_format in images.FORMATS:
+        with Image.open(tmp_path / f"Art/2DItems/Currency/Orb.{image_format}") as image:
+            assert image.size == (4, 4)
+    manifest = images.ImageManifest(str(tmp_path))
+    assert manifest.images[ICON]["dds"] == md5(_dds((255, 0, 0, 255))).hexdigest()
+
+
+def test_skips_unchanged_images(tmp_path):
+    files = {ICON: _dds((255, 0, 0, 255)), OTHER_ICON: _dds((0, 255, 0, 255))}
+    _export(tmp_path, files)
+    png = tmp_path / "Art/2DItems/Currency/Orb.png"
+    png.write_bytes(STALE)
+    _export(tmp_path, files)
+    assert _read(png) == STALE
+
+    files[ICON] = _dds((0, 0, 255, 255))
+    _export(tmp_path, files)
+    assert _read(png) != STALE
+
+
+def test_exports_deleted_images_again(tmp_path):
+    files = {ICON: _dds((255, 0, 0, 255)), OTHER_ICON: _dds((0, 255, 0, 255))}
+    _export(tmp_path, files)
+    (tmp_path / "Art/2DItems/Currency/Orb.webp").unlink()
+    other_png = tmp_path / "Art/2DItems/Currency/Shard.png"
+    other_png.write_bytes(STALE)
+    _export(tmp_path, files)
+    assert (tmp_path / "Art/2DItems/Currency/Orb.webp").is_file()
+    assert _read(other_png) == STALE
+
+
+def test_reports_failures_without_manifest_entries(tmp_path):
+    failures = _export(tmp_path, {ICON: b"not a dds"}, [ICON, OTHER_ICON])
+    assert failures == [f"{ICON}: not a dds file", f"{OTHER_ICON}: failed to extract: FileNotFoundError: {OTHER_ICON}"]
+    assert images.ImageManifest(str(tmp_path)).images == {}
+
+
+def _legacy(data_path, data: bytes) -> str:
+    """the files an earlier version wrote for the icon, returning the path of its md5sum file"""
+    dest = os.path.join(data_path, os.path.splitext(ICON)[0])
+    os.makedirs(os.path.dirname(dest))
+    for image_format in images.FORMATS:
+        with open(f"{dest}.{image_format}", "wb") as f:
+            f.write(STALE)
+    with open(dest + ".dds.md5sum", "w") as f:
+        f.write(md5(data).hexdigest())
+    return dest + ".dds.md5sum"
+
+
+def test_migrates_md5sum_files(tmp_path):
+    data = _dds((255, 0, 0, 255))
+    md5sum = _legacy(tmp_path, data)
+    _export(tmp_path, {ICON: data})
+    assert _read(tmp_path / "Art/2DItems/Currency/Orb.png") == STALE
+    assert not os.path.exists(md5sum)
+    with open(tmp_path / images.MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    assert manifest["version"] == images.MANIFEST_VERSION
+    assert manifest["images"][ICON] == {
+        "dds": md5(data).hexdigest(),
+        "png": md5(STALE).hexdigest(),
+        "webp": md5(STALE).hexdigest(),
+    }
+
+
+def test_reading_without_migrating(tmp_path):
+    md5sum = _legacy(tmp_path, _dds((255, 0, 0, 255)))
+    assert images.ImageManifest(str(tmp_path), migrate=False).images == {}
+    assert atlases.build_atlases(str(tmp_path)) == 0
+    assert os.path.isfile(md5sum)
+    assert not os.path.exists(tmp_path / images.MANIFEST_FILE)
+
+
+def test_exports_shared_images_once(tmp_path, monkeypatch):
+    for ddsfile in [ICON, OTHER_ICON, ICON]:
+        register_image(ddsfile)
+    assert images.queue.take() == [ICON, OTHER_ICON]
+    assert images.queue.take() == []
+
+    files = {ICON: _dds((255, 0, 0, 255)), OTHER_ICON: _dds((0, 255, 0, 255))}
+    file_system = MemoryFileSystem(files)
+    requested = []
+    monkeypatch.setattr(file_system, "get_file", lambda path: requested.append(path) or files[path])
+    # e.g. a base item and its unique art, registered by different modules
+    assert export_images([ICON, OTHER_ICON, ICON], str(tmp_path), file_system) == []
+    assert requested == [ICON, OTHER_ICON]
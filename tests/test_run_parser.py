@@ -0,0 +1,76 @@
+import argparse
+import multiprocessing
+import os
+from typing import Dict
+
+import pytest
+
+pytest.importorskip("PyPoE")
+
+from benchmarks.fixtures import DatFixture, MemoryFileSystem  # noqa: E402
+from benchmarks.run import NETWORK_MODULES  # noqa: E402
+from RePoE import run_parser  # noqa: E402
+from RePoE.parser import util  # noqa: E402
+from RePoE.parser.modules import get_parser_modules  # noqa: E402
+from RePoE.parser.modules.stat_translations import TRADE_STATS_URL  # noqa: E402
+from RePoE.parser.snapshots import save_snapshot  # noqa: E402
+from RePoE.parser.util import merge_tables  # noqa: E402
+
+SCALE = 0.02
+
+
+def _args(cache_dir: str, jobs: int, modules) -> argparse.Namespace:
+    """the options of run_parser with their defaults"""
+    return argparse.Namespace(
+        file="fixtures",
+        jobs=jobs,
+        incremental=False,
+        cache_dir=cache_dir,
+        dat_cache=False,
+        bundle_cache=False,
+        offline=True,
+        json_backend="python",
+        json_conformance=False,
+        msgpack=False,
+        shards=False,
+        ndjson=False,
+        check_projection=False,
+        profile=False,
+        profile_stats=False,
+        tables=merge_tables(modules),
+    )
+
+
+def _read_tree(directory: str) -> Dict[str, bytes]:
+    files = {}
+    for path, _, names in os.walk(directory):
+        for name in names:
+            with open(os.path.join(path, name), "rb") as f:
+                files[os.path.relpath(os.path.join(path, name), directory)] = f.read()
+    return files
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork", reason="workers only see the fixtures when they are forked"
+)
+def test_parallel_output_matches_serial(tmp_path, monkeypatch):
+    fixture = DatFixture(SCALE)
+    files = fixture.files(SCALE)
+    cache_dir = str(tmp_path / "cache")
+    save_snapshot("trade_stats", TRADE_STATS_URL, cache_dir, fixture.trade_stats(SCALE))
+    monkeypatch.setattr(util, "load_file_system", lambda *args: MemoryFileSystem(files))
+    modules = [m for m in get_parser_modules() if m.__name__ not in NETWORK_MODULES]
+
+    outputs = {}
+    for name, jobs, run in [("serial", 1, run_parser.run_serial), ("parallel", 4, run_parser.run_parallel)]:
+        data_path = tmp_path / name
+        data_path.mkdir()
+        monkeypatch.setattr(run_parser, "__DATA_PATH__", os.path.join(data_path, ""))
+        results = run(modules, _args(cache_dir, jobs, modules))
+        assert set(results) >= {m.__name__ for m in modules}
+        outputs[name] = _read_tree(str(data_path))
+
+    assert outputs["serial"]
+    assert sorted(outputs["parallel"]) == sorted(outputs["serial"])
+    differing = [name for name, data in outputs["serial"].items() if outputs["parallel"][name] != data]
+    assert differing == []
@@ -0,0 +1,188 @@
+import json
+import os
+
+import pytest
+
+import RePoE
+from RePoE.translations import Translator, get_translator
+
+HANDLERS = {
+    "divide_by_one_hundred": {"type": "int", "divisor": 100},
+    "divide_by_fifteen_0dp": {"type": "int", "divisor": 15, "precision": 0},
+    "per_minute_to_per_second_2dp": {"type": "int", "divisor": 60, "precision": 2, "fixed": True},
+    "negate": {"type": "int", "multiplier": -1},
+    "display_indexable_support": {"type": "int", "values": {"1": "Greater Multiple Projectiles"}},
+}
+
+TRANSLATIONS = [
+    {
+        "ids": ["base_maximum_life"],
+        "English": [{"condition": [{}], "format": ["+#"], "index_handlers": [[]], "string": "{0} to maximum Life"}],
+    },
+    {
+        "ids": ["movement_speed_+%"],
+        "English": [
+            {
+                "condition": [{"min": 1}],
+                "format": ["#"],
+                "index_handlers": [[]],
+                "string": "{0}% increased Movement Speed",
+            },
+            {
+                "condition": [{"max": -1}],
+                "format": ["#"],
+                "index_handlers": [["negate"]],
+                "string": "{0}% reduced Movement Speed",
+            },
+        ],
+    },
+    {
+        "ids": ["damage_bypasses_energy_shield_%"],
+        "English": [
+            {
+                "condition": [{"min": 100}],
+                "format": ["ignore"],
+                "index_handlers": [[]],
+                "string": "Damage taken bypasses Energy Shield",
+            },
+            {
+                "condition": [{"min": 100, "negated": True}],
+                "format": ["#"],
+                "index_handlers": [[]],
+                "string": "{0}% of Damage taken bypasses Energy Shield",
+            },
+        ],
+    },
+    {
+        "ids": ["local_minimum_added_fire_damage", "local_maximum_added_fire_damage"],
+        "English": [
+            {
+                "condition": [{}, {}],
+                "format": ["#", "#"],
+                "index_handlers": [[], []],
+                "string": "Adds {0} to {1} Fire Damage",
+            }
+        ],
+    },
+    {
+        "ids": ["life_regeneration_per_minute"],
+        "English": [
+            {
+                "condition": [{}],
+                "format": ["#"],
+                "index_handlers": [["per_minute_to_per_second_2dp"]],
+                "string": "Regenerate {0} Life per second",
+            }
+        ],
+    },
+    {
+        "ids": ["critical_strike_chance_+permyriad"],
+        "English": [
+            {
+                "condition": [{}],
+                "format": ["+#"],
+                "index_handlers": [["divide_by_one_hundred"]],
+                "string": "{0}% to Critical Strike Chance",
+            }
+        ],
+    },
+    {
+        "ids": ["skill_effect_duration_per_15"],
+        "English": [
+            {
+                "condition": [{}],
+                "format": ["#"],
+                "index_handlers": [["divide_by_fifteen_0dp"]],
+                "string": "{0} seconds",
+            }
+        ],
+    },
+    {
+        "ids": ["supported_by_indexable_support"],
+        "English": [
+            {
+                "condition": [{}],
+                "format": ["#"],
+                "index_handlers": [["display_indexable_support"]],
+                "string": "Socketed Gems are Supported by {0}",
+            }
+        ],
+    },
+    {
+        "ids": ["hidden_stat"],
+        "hidden": True,
+        "English": [{"condition": [{}], "format": ["#"], "index_handlers": [[]], "string": "{0} hidden"}],
+    },
+]
+
+
+@pytest.fixture(autouse=True)
+def data_path(tmp_path, monkeypatch):
+    for name, data in [("stat_translations", TRANSLATIONS), ("stat_value_handlers", HANDLERS)]:
+        with open(tmp_path / f"{name}.min.json", "w") as f:
+            json.dump(data, f)
+    monkeypatch.setattr(RePoE, "__DATA_PATH__", os.path.join(tmp_path, ""))
+    monkeypatch.setattr(RePoE, "_cache", {})
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "stats, lines",
+    [
+        ({"movement_speed_+%": 10}, ["10% increased Movement Speed"]),
+        ({"movement_speed_+%": -10}, ["10% reduced Movement Speed"]),
+        ({"damage_bypasses_energy_shield_%": 100}, ["Damage taken bypasses Energy Shield"]),
+        ({"damage_bypasses_energy_shield_%": 25}, ["25% of Damage taken bypasses Energy Shield"]),
+        # ranges use the first line both ends match, else the first line one end matches
+        ({"movement_speed_+%": (5, 10)}, ["(5 to 10)% increased Movement Speed"]),
+        ({"movement_speed_+%": (-10, -5)}, ["(10 to 5)% reduced Movement Speed"]),
+        ({"movement_speed_+%": (-5, 10)}, ["(-5 to 10)% increased Movement Speed"]),
+    ],
+)
+def test_condition_selection(stats, lines):
+    assert Translator().translate(stats) == lines
+
+
+@pytest.mark.parametrize(
+    "stats, lines",
+    [
+        ({"base_maximum_life": 50}, ["+50 to maximum Life"]),
+        ({"base_maximum_life": -5}, ["-5 to maximum Life"]),
+        ({"base_maximum_life": (-10, -5)}, ["-(10 to 5) to maximum Life"]),
+        ({"critical_strike_chance_+permyriad": 150}, ["+1.5% to Critical Strike Chance"]),
+        ({"critical_strike_chance_+permyriad": 200}, ["+2% to Critical Strike Chance"]),
+        ({"life_regeneration_per_minute": 90}, ["Regenerate 1.50 Life per second"]),
+        # 0dp rounds, whatever the number of digits before the decimal point
+        ({"skill_effect_duration_per_15": 1506}, ["100 seconds"]),
+        ({"skill_effect_duration_per_15": 306}, ["20 seconds"]),
+        ({"supported_by_indexable_support": 1}, ["Socketed Gems are Supported by Greater Multiple Projectiles"]),
+    ],
+)
+def test_handler_selection(stats, lines):
+    assert Translator().translate(stats) == lines
+
+
+def test_partial_stats_default_to_zero():
+    assert Translator().translate({"local_maximum_added_fire_damage": 5}) == ["Adds 0 to 5 Fire Damage"]
+    assert Translator().translate({"local_minimum_added_fire_damage": 0, "local_maximum_added_fire_damage": 0}) == []
+
+
+def test_unknown_and_hidden_stats():
+    assert Translator().translate({"unknown_stat": 1, "hidden_stat": 1}) == []
+    assert Translator(include_hidden=True).translate({"hidden_stat": 1}) == ["1 hidden"]
+
+
+def test_translate_batch_matches_translate():
+    items = [{"movement_speed_+%": value, "base_maximum_life": value * 10} for value in [-3, 0, 7]]
+    translator = Translator()
+    assert translator.translate_batch(items) == [translator.translate(stats) for stats in items]
+
+
+def test_get_translator_reloads_changed_files(data_path):
+    translator = get_translator()
+    assert get_translator() is translator
+    with open(data_path / "stat_value_handlers.min.json", "w") as f:
+        json.dump({**HANDLERS, "divide_by_one_hundred": {"type": "int", "divisor": 10}}, f)
+    os.utime(data_path / "stat_value_handlers.min.json", ns=(0, 0))
+    assert get_translator() is not translator
+    assert get_translator().translate({"critical_strike_chance_+permyriad": 150}) == ["+15% to Critical Strike Chance"]